@@ -0,0 +1,56 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+from __future__ import absolute_import, division, unicode_literals
+
+import flask
+from werkzeug.wrappers import Response
+
+from active_data import record_request
+from jx_elasticsearch.es52 import agg_bulk
+from jx_elasticsearch.es52.bulk_storage import FileStorage
+from mo_files import mimetype
+from mo_logs import Log
+from mo_threads.threads import register_thread
+from pyLibrary.env.flask_wrappers import cors_wrapper
+
+CHUNK_SIZE = 64 * 1024
+
+
+@cors_wrapper
+@register_thread
+def send_bulk_result(filename):
+    """
+    SEND A BULK QUERY RESULT (OR ITS STATUS) KEPT ON LOCAL DISK
+    :param filename:  URL PATH
+    :return: Response OBJECT WITH FILE CONTENT
+    """
+    try:
+        record_request(flask.request, None, flask.request.get_data(), None)
+        storage = agg_bulk.STORAGE
+        if not isinstance(storage, FileStorage):
+            return Response(b"", status=404)
+        file, encoding = storage.get_file(filename)
+        if not file:
+            return Response(b"", status=404)
+
+        headers = {"Content-Type": mimetype.JSON}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(_stream(file), status=200, headers=headers)
+    except Exception as e:
+        Log.error("Could not get file {{file}}", file=filename, cause=e)
+
+
+def _stream(file):
+    with open(file.abspath, "rb") as content:
+        while True:
+            data = content.read(CHUNK_SIZE)
+            if not data:
+                return
+            yield data
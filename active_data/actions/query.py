@@ -8,6 +8,8 @@
 #
 from __future__ import absolute_import, division, unicode_literals
 
+from time import time
+
 import flask
 from flask import Response
 
@@ -20,15 +22,18 @@ from active_data.actions import (
     send_error,
     test_mode_wait,
 )
+from active_data.actions.scheduler import Scheduler
 from jx_base.container import Container
+from jx_base.expressions import QueryOp
+from jx_elasticsearch.es52 import ES52
+from jx_elasticsearch.search_batch import SearchBatch
 from jx_python import jx
-from mo_dots import Data, Null, is_data
+from mo_dots import Data, Null, coalesce, from_data, is_data
 from mo_files import File
 from mo_future import binary_type, text
 from mo_json import json2value, value2json
 from mo_logs import Except, Log, strings
-from mo_threads import Queue, Signal
-from mo_threads.threads import register_thread, MAIN_THREAD, Thread
+from mo_threads.threads import register_thread, MAIN_THREAD
 from mo_times.timer import Timer
 from pyLibrary.env.flask_wrappers import cors_wrapper
 
@@ -36,8 +41,11 @@ DEBUG = False
 BLANK = File("active_data/public/error.html").read().encode("utf8")
 QUERY_SIZE_LIMIT = 10 * 1024 * 1024
 NUM_THREADS = 30
+MAX_FAN_OUT = 8  # MAXIMUM SUB-QUERIES OF ONE tuple REQUEST RUNNING AT ONCE
+STREAM_MIN_LIMIT = 1000  # list QUERIES ASKING FOR MORE ROWS THAN THIS ARE STREAMED
+STREAM_CHUNK_SIZE = 64 * 1024  # BYTES TO ACCUMULATE BEFORE SENDING
 
-todo = Queue("todo queries")
+query_cache = None  # SET TO QueryCache INSTANCE TO ENABLE RESULT CACHING
 
 
 @cors_wrapper
@@ -60,10 +68,14 @@ def jx_query(path):
                 query = json2value(text)
                 record_request(flask.request, query, None, None)
 
+                if is_streamable(query):
+                    query.destination = "stream"
+
             result = []
             if query.tuple != None:
-                execute_tuple_op(query, result, Null)
+                execute_tuple_op(query, result, Null, get_client(flask.request))
                 result = Data(data=result[0])
+                result.meta.timing.scheduler = tuple_scheduler.stats()
             else:
                 execute(query, result, Null)
                 result = result[0]
@@ -71,6 +83,12 @@ def jx_query(path):
             result.meta.timing.preamble = mo_math.round(
                 preamble_timer.duration.seconds, digits=4
             )
+            if query.destination == "stream":
+                return Response(
+                    stream_result(result, total_timer),
+                    status=200,
+                    headers={"Content-Type": result.meta.content_type},
+                )
             result.meta.timing.total = "{{TOTAL_TIME}}"  # TIMING PLACEHOLDER
 
             with Timer("jsonification", verbose=DEBUG) as json_timer:
@@ -104,10 +122,75 @@ def jx_query(path):
         return send_error(total_timer, request_body, e)
 
 
-def execute(query, output, is_done):
+def is_streamable(query):
+    """
+    RETURN True IF THE (LARGE) list RESPONSE SHOULD BE SENT AS IT IS ENCODED
+    """
+    if query.tuple != None or query.destination or query.meta.save:
+        return False
+    if query.format != "list":
+        return False
+    return mo_math.is_integer(query.limit) and query.limit > STREAM_MIN_LIMIT
+
+
+def stream_result(result, total_timer):
+    """
+    GENERATE THE JSON RESPONSE IN CHUNKS, SO WE NEVER HOLD THE WHOLE RESPONSE IN MEMORY
+    THE data IS SENT FIRST, AND THE meta (WITH TIMING) IS SENT LAST
+    :param result: {"meta":meta, "data":rows} WHERE rows CAN BE AN ITERATOR
+    :param total_timer: Timer STARTED AT BEGINNING OF REQUEST
+    """
+    # READING result.data WOULD TURN THE ITERATOR INTO A LIST, SO USE THE RAW dict
+    raw = from_data(result)
+    json_timer = Timer("jsonification", silent=True)
+    num_bytes = 0
+    acc = []
+    acc_size = 0
+    try:
+        with json_timer:
+            yield b'{"data":['
+            comma = b""
+        for row in raw["data"]:
+            with json_timer:
+                chunk = comma + value2json(row).encode("utf8")
+                comma = b",\n"
+                acc.append(chunk)
+                acc_size += len(chunk)
+            if acc_size >= STREAM_CHUNK_SIZE:
+                yield b"".join(acc)
+                num_bytes += acc_size
+                acc = []
+                acc_size = 0
+        tail = b"]"
+    except Exception as cause:
+        cause = Except.wrap(cause)
+        Log.warning("Problem streaming response", cause=cause)
+        # THE STATUS IS ALREADY SENT, SO MARK THE RESPONSE AS INCOMPLETE
+        tail = b'],"error":' + value2json(cause).encode("utf8")
+
+    with json_timer:
+        for k, v in raw.items():
+            if k in ("data", "meta"):
+                continue
+            acc.append(b"," + value2json(k).encode("utf8") + b":" + value2json(v).encode("utf8"))
+        meta = result.meta
+        meta.timing.jsonification = mo_math.round(json_timer.agg, digits=4)
+        meta.timing.total = mo_math.round(time() - total_timer.start, digits=4)
+        acc.append(tail + b',"meta":' + value2json(meta).encode("utf8") + b"}")
+    last = b"".join(acc)
+    num_bytes += len(last)
+    yield last
+    Log.note(
+        "Response is {{num}} bytes in {{duration}} seconds (streamed)",
+        num=num_bytes,
+        duration=meta.timing.total,
+    )
+
+
+def execute(query, output, is_done, client=None):
     try:
         if query["tuple"] != None:
-            return execute_tuple_op(query, output, is_done)
+            return execute_tuple_op(query, output, is_done, client)
 
         if query.meta.testing:
             test_mode_wait(query, MAIN_THREAD.please_stop)
@@ -117,13 +200,29 @@ def execute(query, output, is_done):
 
         translate_timer = Timer("translate", verbose=DEBUG)
         with translate_timer:
-            query_result = jx.run(query, container=frum)
+            query_op = query
+            cache_key = None
+            result = None
+            if is_cacheable(query, frum):
+                query_op = QueryOp.wrap(query, container=frum, namespace=frum.namespace)
+                cache_key = query_cache.key(query_op, query.format, frum.es)
+                if cache_key:
+                    result = query_cache.get(cache_key)
 
-            # TODO: REMOVE THIS CHECK, jx SHOULD ALWAYS RETURN Containers
-            if isinstance(query_result, Container):
-                result = query_result.format(query.format)
+            if result is None:
+                query_result = jx.run(query_op, container=frum)
+
+                # TODO: REMOVE THIS CHECK, jx SHOULD ALWAYS RETURN Containers
+                if isinstance(query_result, Container):
+                    result = query_result.format(query.format)
+                else:
+                    result = query_result
+                if cache_key:
+                    query_cache.add(cache_key, result)
+                    result.meta.timing.cache = "miss"
             else:
-                result = query_result
+                # CACHED RESULTS HAVE NO timing; WHAT FOLLOWS IS FOR THIS REQUEST
+                result.meta.timing.cache = "hit"
             output.append(result)
 
         save_timer = Timer("save", verbose=DEBUG)
@@ -141,6 +240,8 @@ def execute(query, output, is_done):
             translate_timer.duration.seconds, digits=4
         )
         result.meta.timing.save = mo_math.round(save_timer.duration.seconds, digits=4)
+        if cache_key:
+            result.meta.timing.cache_stats = query_cache.stats()
     except Exception as cause:
         Log.error(
             "could not execute expression {{expression}}", expression=query, cause=cause
@@ -149,7 +250,24 @@ def execute(query, output, is_done):
         is_done.go()
 
 
-def execute_tuple_op(query, output, is_done):
+def is_cacheable(query, frum):
+    """
+    RETURN True IF THE RESULT OF query CAN BE SERVED FROM query_cache
+    """
+    if not query_cache:
+        return False
+    if not isinstance(frum, ES52):
+        return False
+    if query.meta.testing or query.meta.save:
+        return False
+    if query.destination:
+        # BULK QUERIES START AN EXTRACTION, THEY MUST RUN EVERY TIME
+        # STREAMED RESULTS ARE NEVER WHOLE IN MEMORY, SO CAN NOT BE CACHED
+        return False
+    return True
+
+
+def execute_tuple_op(query, output, is_done, client=None):
     try:
         items = query.tuple
         if items == None:
@@ -160,25 +278,32 @@ def execute_tuple_op(query, output, is_done):
                 output.append([])
                 return
             items = [items]
-        work = [(q, [], Signal()) for q in items]
-        todo.extend(work)
-        # IF THERE IS MORE WORK, MIGHT AS WELL DO IT WHILE WE WAIT
-        more = todo.pop_one()
-        if more:
-            execute(*more)
-        for _, _, d in work:
-            d.wait()
-        output.append(tuple(r[0] for _, r, _ in work))
+        # SUB-QUERIES SHARE _msearch REQUESTS TO ES
+        batch = SearchBatch(len(items), width=MAX_FAN_OUT)
+        results = tuple_scheduler.run(
+            items, client=client, please_stop=MAIN_THREAD.please_stop, member=batch
+        )
+        DEBUG and Log.note(
+            "{{num_searches}} searches sent in {{num_requests}} requests",
+            num_searches=batch.num_searches,
+            num_requests=batch.num_requests,
+        )
+        output.append(tuple(results))
     except Exception as cause:
-        Log.warning("Problem with tuple op", cause=cause)
+        Log.error("Problem with tuple op", cause=cause)
     finally:
         is_done.go()
 
 
-def worker(please_stop):
-    while not please_stop:
-        work = todo.pop(till=please_stop)
-        execute(*work)
+def get_client(request):
+    """
+    RETURN KEY USED TO SHARE THE QUERY THREADS FAIRLY BETWEEN CLIENTS
+    """
+    return coalesce(
+        request.headers.get("from"),
+        request.headers.get("x-remote-addr"),
+        request.remote_addr,
+    )
 
 
-threads = [Thread.run("query thread " + text(i), worker) for i in range(NUM_THREADS)]
+tuple_scheduler = Scheduler("query thread", execute, NUM_THREADS, MAX_FAN_OUT)
@@ -0,0 +1,137 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+from __future__ import absolute_import, division, unicode_literals
+
+import hashlib
+from collections import OrderedDict
+
+from mo_dots import dict_to_data, from_data, is_data
+from mo_json import json2value, value2json
+from mo_kwargs import override
+from mo_logs import Log
+from mo_threads import Lock
+from mo_times import Date
+
+DEBUG = False
+
+
+class QueryCache(object):
+    """
+    LRU CACHE OF QUERY RESULTS (AS JSON BYTES)
+    KEYED ON THE NORMALIZED QUERY, AND THE GENERATION OF THE ALIAS IT WAS RUN AGAINST
+    """
+
+    @override
+    def __init__(
+        self,
+        max_bytes=100 * 1024 * 1024,  # TOTAL SIZE OF ALL CACHED RESULTS
+        max_result_bytes=10 * 1024 * 1024,  # RESULTS BIGGER THAN THIS ARE NOT CACHED
+        generation_ttl=5,  # SECONDS TO TRUST A GENERATION MARKER BEFORE ASKING ES AGAIN
+        kwargs=None,
+    ):
+        self.max_bytes = max_bytes
+        self.max_result_bytes = max_result_bytes
+        self.generation_ttl = generation_ttl
+        self.locker = Lock("query cache")
+        self.results = OrderedDict()  # MAP FROM KEY TO JSON BYTES, OLDEST FIRST
+        self.generations = {}  # MAP FROM ALIAS NAME TO (expires, generation) PAIR
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, query_op, format, es):
+        """
+        :param query_op: NORMALIZED QueryOp
+        :param format: THE REQUESTED FORMAT
+        :param es: THE Alias THE QUERY WILL BE SENT TO
+        :return: CACHE KEY, OR None IF THE GENERATION IS NOT KNOWN
+        """
+        generation = self._get_generation(es)
+        if generation is None:
+            return None
+        canonical = value2json(
+            {"query": query_op, "format": format, "generation": generation},
+            sort_keys=True,
+        )
+        return hashlib.sha256(canonical.encode("utf8")).hexdigest()
+
+    def get(self, key):
+        """
+        :return: NEW COPY OF THE RESULT, OR None IF NOT CACHED
+        """
+        with self.locker:
+            content = self.results.pop(key, None)
+            if content is None:
+                self.misses += 1
+                return None
+            self.results[key] = content  # MOVE TO MOST-RECENTLY-USED
+            self.hits += 1
+        return json2value(content.decode("utf8"))
+
+    def add(self, key, result):
+        """
+        :param result: QUERY RESULT; ITS meta.timing IS NOT CACHED, IT BELONGS TO THIS REQUEST ONLY
+        """
+        content = value2json(_without_timing(result)).encode("utf8")
+        size = len(content)
+        if size > self.max_result_bytes:
+            return
+        with self.locker:
+            old = self.results.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self.results[key] = content
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self.results.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        with self.locker:
+            return dict_to_data({
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.results),
+                "bytes": self.bytes,
+            })
+
+    def _get_generation(self, es):
+        alias = es.settings.alias
+        now = Date.now().unix
+        with self.locker:
+            expires, generation = self.generations.get(alias, (0, None))
+        if now < expires:
+            return generation
+
+        try:
+            generation = es.get_generation()
+        except Exception as cause:
+            Log.warning("Can not get generation of {{alias}}", alias=alias, cause=cause)
+            return None
+
+        DEBUG and Log.note("{{alias}} is at generation {{generation}}", alias=alias, generation=generation)
+        with self.locker:
+            self.generations[alias] = (now + self.generation_ttl, generation)
+        return generation
+
+
+def _without_timing(result):
+    """
+    :return: SHALLOW COPY OF result WITHOUT meta.timing
+    """
+    result = from_data(result)
+    meta = from_data(result.get("meta"))
+    if not is_data(meta) or "timing" not in meta:
+        return result
+    output = dict(result)
+    output["meta"] = {k: v for k, v in meta.items() if k != "timing"}
+    return output
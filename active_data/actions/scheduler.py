@@ -0,0 +1,222 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+from __future__ import absolute_import, division, unicode_literals
+
+from collections import OrderedDict, deque
+from time import time
+
+import mo_math
+from mo_dots import Null, dict_to_data, is_data
+from mo_future import text
+from mo_logs import Except, Log
+from mo_math import MAX
+from mo_threads import Lock, Signal, Thread
+
+DEBUG = False
+
+
+class Job(object):
+    __slots__ = ["query", "client", "batch", "output", "error", "queued", "started", "done"]
+
+    def __init__(self, query, client, batch):
+        self.query = query
+        self.client = client
+        self.batch = batch
+        self.output = []
+        self.error = None
+        self.queued = None
+        self.started = None
+        self.done = False
+
+
+class Batch(object):
+    """
+    THE SUB-QUERIES OF ONE REQUEST
+    """
+    __slots__ = ["jobs", "pending", "in_flight", "error", "progress", "member"]
+
+    def __init__(self, member):
+        self.member = member  # CONTEXT ENTERED BY THE THREAD RUNNING EACH JOB
+        self.jobs = []
+        self.pending = deque()  # JOBS NOT YET GIVEN TO THE SCHEDULER
+        self.in_flight = 0  # JOBS QUEUED OR RUNNING
+        self.error = None
+        self.progress = Signal()
+
+
+class Scheduler(object):
+    """
+    RUN SUB-QUERIES ON A FIXED POOL OF THREADS
+    EACH REQUEST MAY ONLY HAVE max_fan_out SUB-QUERIES QUEUED OR RUNNING
+    CLIENTS TAKE TURNS, SO ONE BIG REQUEST CAN NOT STARVE THE OTHERS
+    """
+
+    def __init__(self, name, execute, num_threads, max_fan_out):
+        """
+        :param name: PREFIX FOR THREAD NAMES
+        :param execute: FUNCTION(query, output, is_done, client) THAT APPENDS RESULT TO output
+        :param num_threads: SIZE OF THE POOL
+        :param max_fan_out: MAXIMUM SUB-QUERIES PER REQUEST IN THE POOL AT ONCE
+        """
+        self.execute = execute
+        self.max_fan_out = max_fan_out
+        self.locker = Lock(name)
+        self.clients = OrderedDict()  # MAP FROM CLIENT TO deque OF Job, IN ROUND-ROBIN ORDER
+        self.depth = 0
+        self.running = 0
+        self.num_waits = 0
+        self.total_wait = 0
+        self.max_wait = 0
+        self.threads = [
+            Thread.run(name + " " + text(i), self._worker) for i in range(num_threads)
+        ]
+
+    def run(self, queries, client=None, please_stop=Null, member=None):
+        """
+        RUN ALL queries, RETURN LIST OF RESULTS (IN ORDER)
+        THE CALLING THREAD ALSO RUNS ITS OWN SUB-QUERIES WHILE IT WAITS
+        IF ANY SUB-QUERY FAILS, THE REMAINING SUB-QUERIES ARE CANCELLED
+        :param member: OPTIONAL CONTEXT MANAGER ENTERED AROUND EACH SUB-QUERY
+        """
+        client = client or ""
+        batch = Batch(member)
+        for q in queries:
+            job = Job(q, client, batch)
+            batch.jobs.append(job)
+            batch.pending.append(job)
+
+        while True:
+            with self.locker:
+                if please_stop and not batch.error:
+                    batch.error = Except(template="Shutdown requested")
+                if batch.error:
+                    self._cancel(batch)
+                    break
+                if not batch.pending and not batch.in_flight:
+                    break
+                while batch.pending and batch.in_flight < self.max_fan_out:
+                    self._enqueue(batch.pending.popleft())
+                own = self._take_own(batch)
+                progress = batch.progress = Signal()
+
+            if own:
+                self._run(own)
+            else:
+                (progress | please_stop).wait()
+
+        if batch.error:
+            Log.error("Problem with sub-query", cause=batch.error)
+        return [job.output[0] for job in batch.jobs]
+
+    def stats(self):
+        with self.locker:
+            return dict_to_data({
+                "depth": self.depth,
+                "running": self.running,
+                "clients": len(self.clients),
+                "waits": self.num_waits,
+                "avg_wait": self.total_wait / self.num_waits if self.num_waits else None,
+                "max_wait": self.max_wait,
+            })
+
+    def _enqueue(self, job):
+        # ASSUME LOCKED
+        job.queued = time()
+        job.batch.in_flight += 1
+        queue = self.clients.get(job.client)
+        if queue is None:
+            queue = self.clients[job.client] = deque()
+        queue.append(job)
+        self.depth += 1
+
+    def _next(self):
+        # ASSUME LOCKED
+        # TAKE FROM THE CLIENT THAT HAS WAITED LONGEST FOR A TURN
+        for client, queue in self.clients.items():
+            job = queue.popleft()
+            del self.clients[client]
+            if queue:
+                self.clients[client] = queue  # BACK OF THE LINE
+            self._start(job)
+            return job
+        return None
+
+    def _take_own(self, batch):
+        # ASSUME LOCKED
+        for job in batch.jobs:
+            if job.queued is None or job.started is not None or job.done:
+                continue
+            queue = self.clients.get(job.client)
+            if queue is None or job not in queue:
+                continue
+            queue.remove(job)
+            if not queue:
+                del self.clients[job.client]
+            self._start(job)
+            return job
+        return None
+
+    def _start(self, job):
+        # ASSUME LOCKED
+        job.started = time()
+        wait = job.started - job.queued
+        self.depth -= 1
+        self.running += 1
+        self.num_waits += 1
+        self.total_wait += wait
+        self.max_wait = MAX([self.max_wait, wait])
+
+    def _cancel(self, batch):
+        # ASSUME LOCKED
+        batch.pending.clear()
+        for job in batch.jobs:
+            if job.queued is None or job.started is not None:
+                continue
+            queue = self.clients.get(job.client)
+            if queue is None or job not in queue:
+                continue
+            queue.remove(job)
+            if not queue:
+                del self.clients[job.client]
+            self.depth -= 1
+            batch.in_flight -= 1
+            DEBUG and Log.note("cancelled sub-query")
+
+    def _run(self, job):
+        try:
+            member = job.batch.member
+            if member is None:
+                self.execute(job.query, job.output, Null, job.client)
+            else:
+                with member:
+                    self.execute(job.query, job.output, Null, job.client)
+            result = job.output[0]
+            if is_data(result):
+                result.meta.timing.wait = mo_math.round(job.started - job.queued, digits=4)
+        except Exception as cause:
+            job.error = Except.wrap(cause)
+        finally:
+            with self.locker:
+                job.done = True
+                self.running -= 1
+                batch = job.batch
+                batch.in_flight -= 1
+                if job.error and not batch.error:
+                    batch.error = job.error
+                batch.progress.go()
+
+    def _worker(self, please_stop):
+        while not please_stop:
+            with self.locker:
+                job = self._next()
+                while job is None and not please_stop:
+                    self.locker.wait(till=please_stop)
+                    job = self._next()
+            if job is not None:
+                self._run(job)
@@ -25,15 +25,18 @@ from flask import Flask, Response
 
 import active_data
 from active_data import OVERVIEW, record_request
-from active_data.actions import save_query
+from active_data.actions import query, save_query
+from active_data.actions.bulk import send_bulk_result
 from active_data.actions.contribute import send_contribute
 from active_data.actions.json import get_raw_json
 from active_data.actions.query import jx_query
+from active_data.actions.query_cache import QueryCache
 from active_data.actions.save_query import SaveQueries, find_query
 from active_data.actions.sql import sql_query
 from active_data.actions.static import download, send_favicon
 from jx_base import container
 from jx_elasticsearch.es52 import agg_bulk, QueryStats
+from jx_elasticsearch.es52.bulk_storage import new_storage
 from jx_elasticsearch import elasticsearch
 from mo_dots import is_data
 from mo_files import File, TempFile
@@ -110,6 +113,7 @@ flask_app.add_url_rule(
     "/sql/", None, sql_query, defaults={"path": ""}, methods=["GET", "POST"]
 )
 flask_app.add_url_rule("/json/<path:path>", None, get_raw_json, methods=["GET"])
+flask_app.add_url_rule("/bulk/<path:filename>", None, send_bulk_result, methods=["GET"])
 
 
 @flask_app.route("/", defaults={"path": ""}, methods=["GET", "POST"])
@@ -140,11 +144,10 @@ def setup():
     constants.set(config.constants)
     Log.start(config.debug)
 
-    if config.bulk.s3:
-        agg_bulk.S3_CONFIG = config.bulk.s3
-    else:
+    agg_bulk.STORAGE = new_storage(config.bulk)
+    if not agg_bulk.STORAGE:
         Log.alert(
-            "Bulk queries are disabled, add `bulk.s3` properties to config to enable"
+            "Bulk queries are disabled, add `bulk.s3` or `bulk.local` properties to config to enable"
         )
 
     File.new_instance("activedata.pid").write(text(machine_metadata.pid))
@@ -178,6 +181,9 @@ def setup():
         "settings": config.elasticsearch.copy(),
     }
 
+    if config.query_cache:
+        setattr(query, "query_cache", QueryCache(config.query_cache))
+
     # TRIGGER FIRST INSTANCE
     if config.saved_queries:
         setattr(save_query, "query_finder", SaveQueries(config.saved_queries))
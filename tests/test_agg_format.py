@@ -0,0 +1,157 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from copy import deepcopy
+
+from jx_base.expressions import QueryOp
+from jx_elasticsearch.es52 import agg_format, agg_op  # agg_op SATISFIES agg_format's expect()
+from jx_elasticsearch.es52.agg_format import _groupby_columns, format_table_from_groupby
+from jx_elasticsearch.es52.agg_op import aggop_to_plan
+from jx_elasticsearch.es52.es_query import Aggs
+from jx_elasticsearch.meta import Schema, Table
+from jx_elasticsearch.meta_columns import ColumnIndex
+from mo_dots import Data, FlatList
+from mo_json import value2json
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from tests.test_column_index import FakeSnowflake, new_columns
+
+
+class FakeDecoder(object):
+    def __init__(self, dim):
+        self.edge = Data(name="a", dim=dim)
+
+    def get_index(self, parts, es_query, index):
+        return parts[0]["key"]
+
+    def get_value(self, index):
+        return index
+
+
+class FakeSelect(object):
+    def __init__(self, name, field, aggregate="sum", default=None):
+        self.name = name
+        self.field = field
+        self.aggregate = aggregate
+        self.default = default
+
+    def pull(self, agg):
+        return agg.get(self.field, {}).get("value")
+
+
+class FakeContainer(object):
+    """
+    ENOUGH OF AN ES CONTAINER, AND ITS NAMESPACE, TO WRAP AND TRANSLATE QUERIES
+    """
+
+    def __init__(self):
+        self.namespace = self
+        self.schema = Schema(".", FakeSnowflake(ColumnIndex(new_columns())))
+
+    def get_schema(self, name):
+        return self.schema
+
+    def get_table(self, name):
+        return Table(name, self)
+
+
+def groupby_query(decoders, selects):
+    root = Aggs()
+    filter = Aggs("_filter")
+    match = Aggs("_match")
+    match.decoders = decoders
+    count = Aggs()
+    count.selects = [s for s in selects if s.field == "count"]
+    total = Aggs("_filter_b")
+    total.selects = [s for s in selects if s.field == "total"]
+    root.children.append(filter)
+    filter.children.append(match)
+    match.children.extend([count, total])
+    return root
+
+
+AGGS = {"_filter": {"doc_count": 6, "_match": {"buckets": [
+    {"key": "x", "doc_count": 3, "count": {"value": 3}, "_filter_b": {"doc_count": 2, "total": {"value": 10}}},
+    {"key": "y", "doc_count": 0},
+    {"key": "z", "doc_count": 3, "count": {"value": 3}, "_filter_b": {"doc_count": 0}},
+]}}}
+
+
+class TestAggFormat(FuzzyTestCase):
+    def test_groupby_columns(self):
+        selects = FlatList([FakeSelect("count", "count"), FakeSelect("total", "total", default=0)])
+        decoders = [FakeDecoder(0)]
+        result = format_table_from_groupby(AGGS, groupby_query(decoders, selects), Data(), decoders, selects)
+        self.assertEqual(result.header, ("a", "count", "total"))
+        self.assertEqual(result.data, [("x", 3, 10), ("z", 3, 0)])
+
+    def test_deeper_dimension_not_simple(self):
+        selects = FlatList([FakeSelect("count", "count")])
+        decoders = [FakeDecoder(0), FakeDecoder(1)]
+        self.assertIsNone(_groupby_columns(AGGS, groupby_query(decoders[:1], selects), decoders, selects))
+        es_query = groupby_query(decoders[:1], selects)
+        es_query.children[0].children[0].children[0].decoders = decoders[1:]
+        self.assertIsNone(_groupby_columns(AGGS, es_query, decoders[:1], selects))
+
+    def test_real_groupby_uses_columns(self):
+        container = FakeContainer()
+        query = {
+            "from": "testdata",
+            "groupby": ["build.branch"],
+            "select": [
+                {"name": "count", "value": "result.duration", "aggregate": "count"},
+                {"value": "result.duration", "aggregate": "sum"},
+            ],
+            "format": "table",
+        }
+
+        def run(columnar):
+            # EACH FORMAT NEEDS ITS OWN DECODERS, AND RESPONSE
+            _, (q, selects, acc, decoders), _ = aggop_to_plan(QueryOp.wrap(query, container, container))
+            self.assertEqual([c.name for c in acc.children], ["_match", "_missing"])
+            found = []
+
+            def spy(*args):
+                output = _groupby_columns(*args) if columnar else None
+                found.append(output)
+                return output
+
+            agg_format._groupby_columns = spy
+            try:
+                result = format_table_from_groupby(deepcopy(GROUPBY_AGGS), acc, q, decoders, FlatList(selects))
+            finally:
+                agg_format._groupby_columns = _groupby_columns
+            return result, found
+
+        fast, found = run(True)
+        self.assertIsNotNone(found[0])
+        slow, _ = run(False)
+        self.assertEqual(fast.header, ("build.branch", "count", "result.duration"))
+        self.assertEqual(fast.data, [("beta", 1, 2.0), ("master", 3, 6.0), (None, 2, 1.0)])
+        self.assertEqual(value2json(fast.data), value2json(slow.data))
+
+
+def stats(values):
+    return {
+        "result.duration": {"count": len(values), "sum": sum(values), "min": min(values), "max": max(values)},
+        "result.duration.~n~_count": {"value": len(values)},
+    }
+
+
+GROUPBY_AGGS = {
+    "doc_count": 7,
+    "_match": {"buckets": [
+        dict(key="beta", doc_count=1, **stats([2.0])),
+        dict(key="master", doc_count=3, **stats([1.0, 2.0, 3.0])),
+        {"key": "release", "doc_count": 0},
+    ]},
+    "_missing": dict(doc_count=2, **stats([0.5, 0.5])),
+}
@@ -0,0 +1,81 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from jx_elasticsearch.elasticsearch import Index, LF
+from mo_dots import Data, to_data
+from mo_json import json2value, value2json
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_threads import Lock
+
+
+class FakeCluster(object):
+    version = "6.8.0"
+
+    def __init__(self, reject=(), drop=0):
+        self.locker = Lock()
+        self.bodies = []
+        self.reject = set(reject)  # ids TO REJECT, ONCE
+        self.drop = drop  # NUMBER OF items TO LEAVE OUT OF EACH RESPONSE
+
+    def post(self, path, data, **kwargs):
+        docs = [json2value(line.decode("utf8")) for line in data.split(LF)[1::2]]
+        items = []
+        with self.locker:
+            self.bodies.append(docs)
+            for d in docs:
+                if d.id in self.reject:
+                    self.reject.remove(d.id)
+                    items.append({"index": {"_id": d.id, "status": 429}})
+                else:
+                    items.append({"index": {"_id": d.id, "status": 201}})
+        return to_data({"items": items[self.drop:]})
+
+
+def new_index(cluster, **settings):
+    index = object.__new__(Index)
+    index.debug = False
+    index.cluster = cluster
+    index.path = "/test/test"
+    index.settings = Data(index="test", read_only=False, bulk_retries=2, bulk_backoff=0, **settings)
+    index.encode = lambda r: (r["id"], None, value2json(r["value"]))
+    index.ingest_locker = Lock()
+    index.ingest = Data(docs=0, bytes=0, requests=0, seconds=0, rejected=0, retried=0)
+    return index
+
+
+def records(n):
+    return [{"id": str(i), "value": {"id": str(i), "data": "x" * 100}} for i in range(n)]
+
+
+class TestBulkInsert(FuzzyTestCase):
+    def test_batched_by_bytes(self):
+        cluster = FakeCluster()
+        index = new_index(cluster, max_bulk_bytes=1000, max_in_flight=3)
+        index.extend(records(20))
+        self.assertGreater(len(cluster.bodies), 1)
+        self.assertEqual(sorted(d.id for b in cluster.bodies for d in b), sorted(str(i) for i in range(20)))
+        self.assertEqual(index.ingest_stats().docs, 20)
+
+    def test_only_rejected_resent(self):
+        cluster = FakeCluster(reject=["3", "7"])
+        index = new_index(cluster)
+        index.extend(records(10))
+        self.assertEqual(len(cluster.bodies), 2)
+        self.assertEqual(sorted(d.id for d in cluster.bodies[1]), ["3", "7"])
+        stats = index.ingest_stats()
+        self.assertEqual(stats.rejected, 2)
+        self.assertEqual(stats.retried, 2)
+
+    def test_missing_items(self):
+        cluster = FakeCluster(drop=1)
+        index = new_index(cluster)
+        self.assertRaises(Exception, lambda: index.extend(records(10)))
@@ -0,0 +1,60 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from jx_elasticsearch.es52 import agg_bulk
+from jx_elasticsearch.es52.agg_bulk import fetch_partitions, set_partition
+from mo_dots import Data, Null
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_threads import Lock, Till
+
+TEMPLATE = {"size": 0, "aggs": {"_filter": {"aggs": {"_match": {"terms": {"field": "a"}}}}}}
+
+
+class FakeAlias(object):
+    def __init__(self):
+        self.locker = Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def search(self, query, timeout=None):
+        with self.locker:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        partition = query["aggs"]["_filter"]["aggs"]["_match"]["terms"]["include"]["partition"]
+        Till(seconds=0.01 * ((7 - partition) % 3)).wait()
+        with self.locker:
+            self.running -= 1
+        return Data(aggregations={"partition": partition})
+
+
+class TestBulkPartitions(FuzzyTestCase):
+    def test_set_partition_leaves_template(self):
+        query = set_partition(TEMPLATE, 3, 10)
+        self.assertEqual(
+            query["aggs"]["_filter"]["aggs"]["_match"]["terms"],
+            {"field": "a", "include": {"partition": 3, "num_partitions": 10}},
+        )
+        self.assertNotIn("include", TEMPLATE["aggs"]["_filter"]["aggs"]["_match"]["terms"])
+
+    def test_partitions_in_order(self):
+        es = FakeAlias()
+        esq = Data(es=es)
+        old, agg_bulk.NUM_PARALLEL_PARTITIONS = agg_bulk.NUM_PARALLEL_PARTITIONS, 3
+        try:
+            result = [
+                (i, aggs["partition"])
+                for i, aggs in fetch_partitions(esq, Data(limit=10), {False: TEMPLATE, True: TEMPLATE}, 8, Null)
+            ]
+        finally:
+            agg_bulk.NUM_PARALLEL_PARTITIONS = old
+        self.assertEqual(result, [(i, i) for i in range(8)])
+        self.assertLessEqual(es.max_running, 3)
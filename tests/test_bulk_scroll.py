@@ -0,0 +1,80 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from jx_elasticsearch.es52.set_bulk import scroll_pages
+from mo_dots import Data
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_threads import Lock, Signal
+
+PAGE_SIZE = 3
+
+
+class FakeStream(object):
+    def __init__(self, scroll_id, total, page):
+        self._scroll_id = scroll_id
+        self.hits = Data(total=total)
+        self.hits.hits = iter(page)
+
+    def close(self):
+        pass
+
+
+class FakeAlias(object):
+    """
+    EACH SLICE HOLDS THE DOCUMENTS WHERE doc % max == id
+    """
+
+    def __init__(self, num_docs):
+        self.num_docs = num_docs
+        self.locker = Lock()
+        self.scrolls = {}
+        self.opened = []
+        self.cleared = []
+
+    def search_stream(self, query, scroll=None):
+        slice = query.get("slice", {"id": 0, "max": 1})
+        docs = [d for d in range(self.num_docs) if d % slice["max"] == slice["id"]]
+        with self.locker:
+            scroll_id = "scroll" + str(slice["id"])
+            self.scrolls[scroll_id] = docs
+            self.opened.append(scroll_id)
+        return self.scroll_stream(scroll_id, total=len(docs))
+
+    def scroll_stream(self, scroll_id, total=None):
+        with self.locker:
+            docs = self.scrolls[scroll_id]
+            page, self.scrolls[scroll_id] = docs[:PAGE_SIZE], docs[PAGE_SIZE:]
+        return FakeStream(scroll_id, total, page)
+
+    def clear_scroll(self, scroll_ids):
+        self.cleared.extend(scroll_ids)
+
+
+class TestBulkScroll(FuzzyTestCase):
+    def test_sliced_scroll(self):
+        es = FakeAlias(20)
+        docs = [d for hits, _ in scroll_pages(Data(es=es), Data(sort=["_doc"]), Signal()) for d in hits]
+        self.assertEqual(sorted(docs), list(range(20)))
+        self.assertEqual(len(es.cleared), 4)
+
+    def test_sorted_scroll_is_not_sliced(self):
+        es = FakeAlias(20)
+        docs = [d for hits, _ in scroll_pages(Data(es=es), Data(sort=[{"a": "asc"}]), Signal()) for d in hits]
+        self.assertEqual(docs, list(range(20)))
+        self.assertEqual(es.cleared, ["scroll0"])
+
+    def test_early_stop_clears_scroll(self):
+        es = FakeAlias(100)
+        pages = scroll_pages(Data(es=es), Data(sort=["_doc"]), Signal())
+        next(pages)
+        pages.close()
+        self.assertEqual(sorted(es.cleared), sorted(es.opened))
@@ -0,0 +1,77 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+import gzip
+
+from jx_elasticsearch.es52.bulk_sink import FileSink, S3Sink
+from mo_files import TempDirectory
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+
+class FakeUpload(object):
+    def __init__(self):
+        self.parts = {}
+        self.completed = False
+        self.cancelled = False
+
+    def upload_part_from_file(self, fp, part_num):
+        self.parts[part_num] = fp.read()
+
+    def complete_upload(self):
+        self.completed = True
+
+    def cancel_upload(self):
+        self.cancelled = True
+
+
+class FakeBucket(object):
+    def __init__(self):
+        self.upload = FakeUpload()
+
+    def initiate_multipart_upload(self, key, headers=None):
+        return self.upload
+
+
+class TestBulkSink(FuzzyTestCase):
+    def test_s3_parts(self):
+        bucket = FakeBucket()
+        with S3Sink(bucket, "test.json", part_size=10) as sink:
+            for i in range(5):
+                sink.write(b"0123456")
+
+        upload = bucket.upload
+        self.assertTrue(upload.completed)
+        self.assertEqual(sorted(upload.parts.keys()), [1, 2, 3])
+        self.assertEqual(b"".join(upload.parts[k] for k in sorted(upload.parts.keys())), b"0123456" * 5)
+
+    def test_s3_abort(self):
+        bucket = FakeBucket()
+
+        def write():
+            with S3Sink(bucket, "test.json", part_size=10) as sink:
+                sink.write(b"0123456789")
+                raise Exception("expected failure")
+
+        self.assertRaises(Exception, write)
+        self.assertTrue(bucket.upload.cancelled)
+        self.assertFalse(bucket.upload.completed)
+
+    def test_file_zip(self):
+        with TempDirectory() as temp:
+            with FileSink(temp.abspath, "test.json", zip=True) as sink:
+                sink.write(b'{"data":[')
+                sink.write(b"1,2,3")
+                sink.write(b"]}")
+
+            with gzip.open((temp / "test.json").abspath) as content:
+                self.assertEqual(content.read(), b'{"data":[1,2,3]}')
+            self.assertFalse((temp / "test.json.partial").exists)
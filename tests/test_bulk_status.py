@@ -0,0 +1,45 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from jx_elasticsearch.es52.agg_bulk import StatusReporter, get_running_jobs
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_threads import Till
+
+
+class RecordingReporter(StatusReporter):
+    def __init__(self, guid, interval):
+        StatusReporter.__init__(self, guid, interval)
+        self.written = []
+
+    def _write(self, status):
+        self.written.append(status)
+
+
+class TestBulkStatus(FuzzyTestCase):
+    def test_coalesce_updates(self):
+        status = RecordingReporter("test_coalesce", 100)
+        for i in range(5):
+            status.update({"status": "working", "row": i})
+        self.assertEqual(status.written, [{"status": "working", "row": 0}])
+        self.assertIn("test_coalesce", [j.guid for j in get_running_jobs()])
+
+        status.update({"status": "done"})
+        self.assertEqual(status.written, [{"row": 0}, {"status": "done"}])
+        self.assertNotIn("test_coalesce", [j.guid for j in get_running_jobs()])
+
+    def test_pending_update_is_written(self):
+        status = RecordingReporter("test_pending", 1)
+        status.update({"status": "working", "row": 0})
+        status.update({"status": "working", "row": 1})
+        Till(seconds=3).wait()
+        self.assertEqual(status.written, [{"row": 0}, {"row": 1}])
+        status.update({"status": "error"})
@@ -0,0 +1,105 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+import gzip
+import os
+
+from jx_elasticsearch.es52.bulk_storage import FileStorage, S3Storage
+from mo_dots import Data
+from mo_files import TempDirectory
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times import Date, DAY
+
+
+GUID = "NjQ0z7PyYNwJvNyKXqIF7jkatSw47ch2"
+
+
+class FakeBucket(object):
+    def __init__(self, names):
+        self.keys = {n: Data(name=n, last_modified=Date.now().format()) for n in names}
+
+    def list(self, prefix=""):
+        return [k for n, k in self.keys.items() if n.startswith(prefix)]
+
+    def delete_key(self, name):
+        del self.keys[name]
+
+
+class TestBulkStorage(FuzzyTestCase):
+    def test_local_storage(self):
+        with TempDirectory() as temp:
+            storage = FileStorage(directory=temp.abspath, url="http://localhost/bulk", zip=True)
+            self.assertEqual(storage.url("a.json"), "http://localhost/bulk/a.json")
+
+            with storage.new_sink("a.json") as sink:
+                sink.write(b'{"data":[]}')
+            storage.write("a.status.json", '{"status":"done"}')
+
+            file, encoding = storage.get_file("a.json")
+            self.assertEqual(encoding, "gzip")
+            with gzip.open(file.abspath) as content:
+                self.assertEqual(content.read(), b'{"data":[]}')
+
+            file, encoding = storage.get_file("a.status.json")
+            self.assertEqual(encoding, None)
+            self.assertEqual(file.read(), '{"status":"done"}')
+
+            self.assertEqual(storage.get_file("../a.json"), (None, None))
+
+    def test_cleanup(self):
+        with TempDirectory() as temp:
+            storage = FileStorage(directory=temp.abspath, url="http://localhost/bulk")
+            storage.write(GUID + ".status.json", "{}")
+            storage.cleanup(Date.now() - DAY)
+            self.assertTrue((temp / (GUID + ".status.json")).exists)
+            storage.cleanup(Date.now() + DAY)
+            self.assertFalse((temp / (GUID + ".status.json")).exists)
+
+    def test_cleanup_only_results(self):
+        with TempDirectory() as temp:
+            storage = FileStorage(directory=temp.abspath, url="http://localhost/bulk", zip=True)
+            with storage.new_sink(GUID + ".json") as sink:
+                sink.write(b'{"data":[]}')
+            storage.write(GUID + ".status.json", "{}")
+            (temp / (GUID + ".json.partial")).write("")
+            (temp / "notes.json").write("{}")
+            (temp / "index.html").write("")
+
+            storage.cleanup(Date.now() + DAY)
+            self.assertEqual(
+                sorted(os.path.basename(f.abspath) for f in temp.children),
+                ["index.html", "notes.json"],
+            )
+
+    def test_s3_url(self):
+        storage = S3Storage(bucket="results")
+        self.assertEqual(
+            storage.url("a.json"),
+            "https://active-data-query-results.s3-us-west-2.amazonaws.com/a.json",
+        )
+        storage = S3Storage(bucket="results", url="https://example.com", prefix="bulk/")
+        self.assertEqual(storage.url("a.json"), "https://example.com/bulk/a.json")
+
+    def test_s3_cleanup_only_results(self):
+        storage = S3Storage(bucket="results", prefix="bulk/")
+        storage.bucket = FakeBucket([
+            "bulk/" + GUID + ".json",
+            "bulk/" + GUID + ".status.json",
+            "bulk/notes.json",
+            "other/" + GUID + ".json",
+            "index.html",
+        ])
+        storage.cleanup(Date.now() + DAY)
+        self.assertEqual(
+            sorted(storage.bucket.keys.keys()),
+            ["bulk/notes.json", "index.html", "other/" + GUID + ".json"],
+        )
@@ -0,0 +1,118 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from jx_elasticsearch.elasticsearch import Cluster
+from mo_dots import Data, Null, to_data
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_threads import Lock, Signal, Thread, Till
+from mo_times import Date, SECOND
+
+
+class FakeServer(object):
+    def __init__(self):
+        self.indices = {}  # MAP FROM NAME TO (mapping_version, properties)
+        self.requests = []
+        self.ready = None  # Signal TO HOLD THE CATALOG RESPONSE
+
+    def add(self, name, version, properties):
+        self.indices[name] = (version, properties)
+
+    def get(self, path, **kwargs):
+        self.requests.append(path)
+        if path == "/":
+            return to_data({"version": {"number": "6.8.0"}})
+        if path == "/_cluster/state/metadata":
+            if self.ready is not None:
+                self.ready.wait()
+            return to_data({"metadata": {"indices": {
+                name: {"aliases": [], "mapping_version": version}
+                for name, (version, _) in self.indices.items()
+            }}})
+        names = path.split("/")[1].split(",")
+        if names == ["_all"]:
+            names = list(self.indices.keys())
+        return to_data({
+            name: {"mappings": {"_doc": {"properties": self.indices[name][1]}}}
+            for name in names
+            if name in self.indices
+        })
+
+
+def new_cluster(server):
+    cluster = object.__new__(Cluster)
+    cluster.settings = Data(explore_metadata=True)
+    cluster.debug = False
+    cluster.url = "http://localhost"
+    cluster.info = None
+    cluster._metadata = Null
+    cluster.index_last_updated = {}
+    cluster.metadata_locker = Lock()
+    cluster.metatdata_last_updated = Date.MIN
+    cluster.metadata_refreshing = None
+    cluster.mapping_versions = {}
+    cluster.get = server.get
+    return cluster
+
+
+class TestClusterMetadata(FuzzyTestCase):
+    def test_only_changed_mappings_are_pulled(self):
+        server = FakeServer()
+        server.add("a", 1, {"x": {"type": "keyword"}})
+        server.add("b", 1, {"y": {"type": "keyword"}})
+        cluster = new_cluster(server)
+
+        metadata = cluster.get_metadata(after=Date.now())
+        self.assertEqual(metadata.indices.a.mappings._doc.properties, {"x": {"type": "keyword"}})
+        self.assertIn("/_all/_mapping", server.requests)
+
+        server.requests = []
+        first_seen = cluster.index_last_updated["b"]
+        server.add("a", 2, {"x": {"type": "keyword"}, "z": {"type": "long"}})
+        metadata = cluster.get_metadata(after=Date.now() + SECOND)
+
+        self.assertIn("/a/_mapping", server.requests)
+        self.assertNotIn("/_all/_mapping", server.requests)
+        self.assertEqual(metadata.indices.a.mappings._doc.properties.z.type, "long")
+        self.assertEqual(metadata.indices.b.mappings._doc.properties.y.type, "keyword")
+        self.assertEqual(cluster.index_last_updated["b"], first_seen)
+
+    def test_lost_index(self):
+        server = FakeServer()
+        server.add("a", 1, {"x": {"type": "keyword"}})
+        server.add("b", 1, {"y": {"type": "keyword"}})
+        cluster = new_cluster(server)
+        cluster.get_metadata(after=Date.now())
+
+        del server.indices["b"]
+        metadata = cluster.get_metadata(after=Date.now() + SECOND)
+        self.assertEqual(list(metadata.indices.keys()), ["a"])
+        self.assertNotIn("b", cluster.mapping_versions)
+
+    def test_concurrent_refreshes_share_one_request(self):
+        server = FakeServer()
+        server.add("a", 1, {"x": {"type": "keyword"}})
+        server.ready = Signal()
+        cluster = new_cluster(server)
+        after = Date.now()
+
+        threads = [
+            Thread.run("metadata " + str(i), lambda please_stop: cluster.get_metadata(after=after))
+            for i in range(4)
+        ]
+        while not server.requests:
+            Till(seconds=0.01).wait()
+        Till(seconds=0.1).wait()
+        server.ready.go()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(server.requests.count("/_cluster/state/metadata"), 1)
@@ -0,0 +1,230 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from jx_base import Column
+from jx_elasticsearch.meta import Schema
+from jx_elasticsearch.meta_columns import ColumnIndex, ColumnList
+from mo_dots import relative_field, split_field, join_field, startswith_field
+from mo_json import BOOLEAN, EXISTS, NESTED, NUMBER, OBJECT, STRING, value2json
+from mo_json.typed_encoder import untype_path
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_threads import Lock
+from mo_times import Date
+
+TOP = ["."]
+SUBTESTS = ["result.subtests.~N~", "."]
+LOGS = ["result.subtests.~N~.logs.~N~", "result.subtests.~N~", "."]
+QUERY_PATHS = [TOP, SUBTESTS, LOGS]
+
+# (name, jx_type, es_type, nested_path, multi, cardinality), AS FOUND IN A TYPED INDEX
+COLUMNS = [
+    ("_id", STRING, "keyword", TOP, 1, 1000),
+    ("build", OBJECT, "object", TOP, 1, 1),
+    ("build.~e~", EXISTS, "long", TOP, 1, 1),
+    ("build.branch.~s~", STRING, "keyword", TOP, 1, 12),
+    ("build.date.~n~", NUMBER, "double", TOP, 1, 300),
+    ("build.revision.~s~", STRING, "keyword", TOP, 1, 300),
+    ("etl.id.~n~", NUMBER, "long", TOP, 1, 1000),
+    ("result.duration.~n~", NUMBER, "double", TOP, 1, 500),
+    ("result.ok.~b~", BOOLEAN, "boolean", TOP, 1, 2),
+    ("result.subtests.~N~", NESTED, "nested", TOP, 4, 1),
+    ("result.subtests.~N~.logs.~N~", NESTED, "nested", SUBTESTS, 3, 1),
+    ("result.subtests.~N~.logs.~N~.line.~n~", NUMBER, "long", LOGS, 1, 100),
+    ("result.subtests.~N~.logs.~N~.text.~s~", STRING, "keyword", LOGS, 1, 100),
+    ("result.subtests.~N~.message.~s~", STRING, "keyword", SUBTESTS, 1, 40),
+    ("result.subtests.~N~.name.~s~", STRING, "keyword", SUBTESTS, 1, 40),
+    ("result.subtests.~N~.ok.~b~", BOOLEAN, "boolean", SUBTESTS, 1, 2),
+    ("run.chunk.~n~", NUMBER, "long", TOP, 1, 20),
+    ("run.chunk.~s~", STRING, "keyword", TOP, 1, 3),
+    ("run.name.~s~", STRING, "keyword", TOP, 1, 50),
+    ("run.suite.name.~s~", STRING, "keyword", TOP, 1, 10),
+    ("run.unused.~s~", STRING, "keyword", TOP, 1, 0),  # NEVER SEEN
+    ("runs.~s~", STRING, "keyword", TOP, 1, 5),  # SHARES TEXT, NOT PATH, WITH run
+    ("tags.~s~", STRING, "keyword", TOP, 3, 25),  # MULTI-VALUED
+    ("x\\.y.~s~", STRING, "keyword", TOP, 1, 7),  # LITERAL DOT IN PROPERTY NAME
+]
+NAMES = [c[0] for c in COLUMNS]
+
+
+def new_column(name, jx_type=STRING, es_type="keyword", nested_path=TOP, multi=1, cardinality=1, es_index="testdata"):
+    return Column(
+        name=name,
+        es_column=name,
+        es_index=es_index,
+        es_type=es_type,
+        jx_type=jx_type,
+        nested_path=nested_path,
+        cardinality=cardinality,
+        multi=multi,
+        last_updated=Date.now(),
+    )
+
+
+def new_columns():
+    return sorted((new_column(*c) for c in COLUMNS), key=lambda c: c.name)
+
+
+def new_column_list():
+    columns = object.__new__(ColumnList)
+    columns.data = {}
+    columns.locker = Lock()
+    columns.dirty = False
+    columns.versions = {}
+    columns.indexes = {}
+    return columns
+
+
+class ScanIndex(object):
+    """
+    SAME INTERFACE AS ColumnIndex, USING THE LINEAR SCANS Schema USED BEFORE THE INDEX
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def named(self, name):
+        return [c for c in self.columns if c.name == name]
+
+    def untyped_named(self, name):
+        return [c for c in self.columns if untype_path(c.name) == name]
+
+    def prefixed(self, prefix):
+        return self.columns
+
+    def untyped_prefixed(self, prefix):
+        return self.columns
+
+    def in_nested(self, path):
+        return [c for c in self.columns if c.nested_path[0] == path]
+
+
+class FakeSnowflake(object):
+    def __init__(self, column_index):
+        self.name = "testdata"
+        self.query_paths = QUERY_PATHS
+        self.columns = column_index.columns
+        self.column_index = column_index
+
+
+class TestColumnIndex(FuzzyTestCase):
+    def setUp(self):
+        self.columns = new_columns()
+        self.index = ColumnIndex(self.columns)
+
+    def test_prefixed(self):
+        for prefix in [".", "..build", "build", "run", "result.subtests.~N~", "x\\.y", "missing"]:
+            expected = [c for c in self.columns if startswith_field(c.name, prefix)]
+            self.assertEqual([c.name for c in self.index.prefixed(prefix)], [c.name for c in expected])
+
+    def test_untyped_prefixed(self):
+        for prefix in ["build", "run", "result.subtests", "result.subtests.logs", "x\\.y", "missing"]:
+            expected = [c for c in self.columns if startswith_field(untype_path(c.name), prefix)]
+            self.assertEqual([c.name for c in self.index.untyped_prefixed(prefix)], [c.name for c in expected])
+
+    def test_named(self):
+        for name in NAMES + ["build.branch", "run.chunk", "result.subtests", "missing"]:
+            self.assertEqual([c.name for c in self.index.named(name)], [c.name for c in self.columns if c.name == name])
+            self.assertEqual(
+                [c.name for c in self.index.untyped_named(name)],
+                [c.name for c in self.columns if untype_path(c.name) == name],
+            )
+
+    def test_in_nested(self):
+        for path in QUERY_PATHS:
+            self.assertEqual(
+                [c.name for c in self.index.in_nested(path[0])],
+                [c.name for c in self.columns if c.nested_path[0] == path[0]],
+            )
+
+    def test_rebuilt_only_on_change(self):
+        columns = new_column_list()
+        columns.extend(new_column(*c) for c in COLUMNS)
+
+        index = columns.get_index("testdata")
+        self.assertIs(columns.get_index("testdata"), index)
+        self.assertEqual(len(index.columns), len(NAMES))
+
+        columns.extend([new_column("zz.~s~")])
+        new_index = columns.get_index("testdata")
+        self.assertIsNot(new_index, index)
+        self.assertEqual([c.name for c in new_index.named("zz.~s~")], ["zz.~s~"])
+
+
+class TestSchemaLookups(FuzzyTestCase):
+    """
+    Schema LOOKUPS THROUGH ColumnIndex MUST MATCH THE OLD LINEAR SCANS
+    """
+
+    def setUp(self):
+        columns = new_columns()
+        self.indexed = FakeSnowflake(ColumnIndex(columns))
+        self.scanned = FakeSnowflake(ScanIndex(columns))
+
+    def test_leaves(self):
+        for expected, actual, name in self.lookups(lambda s, n: names(s.leaves(n))):
+            self.assertEqual(value2json(actual), value2json(expected), "leaves(" + name + ")")
+        for expected, actual, name in self.lookups(lambda s, n: names(s.leaves(n, exclude_type=()))):
+            self.assertEqual(value2json(actual), value2json(expected), "leaves(" + name + ")")
+
+    def test_values(self):
+        for expected, actual, name in self.lookups(lambda s, n: [c.name for c in s.values(n)]):
+            self.assertEqual(value2json(actual), value2json(expected), "values(" + name + ")")
+
+    def test_split_values(self):
+        def split_values(schema, name):
+            return {p: [c.name for c in cs] for p, cs in schema.split_values(name).items()}
+
+        for expected, actual, name in self.lookups(split_values):
+            self.assertEqual(value2json(actual), value2json(expected), "split_values(" + name + ")")
+
+    def test_split_leaves(self):
+        for path in QUERY_PATHS:
+            indexed = Schema(path[0], self.indexed)
+            scanned = Schema(path[0], self.scanned)
+            for column in self.scanned.columns:
+                self.assertEqual(
+                    value2json([c.name for c in indexed.split_leaves(column)]),
+                    value2json([c.name for c in scanned.split_leaves(column)]),
+                    "split_leaves(" + column.name + ")",
+                )
+
+    def lookups(self, lookup):
+        """
+        :return: (expected, actual, name) FOR EVERY SCHEMA, AND EVERY NAME A QUERY COULD USE
+        """
+        for path in QUERY_PATHS:
+            indexed = Schema(path[0], self.indexed)
+            scanned = Schema(path[0], self.scanned)
+            for name in probe_names():
+                expected = lookup(scanned, name)
+                yield expected, lookup(indexed, name), name
+                if path is not TOP:
+                    untyped = untype_path(path[0])
+                    # NESTED SCHEMAS ARE ALSO REACHED BY THEIR UNTYPED PATH
+                    self.assertEqual(value2json(lookup(Schema(untyped, self.indexed), name)), value2json(expected))
+
+
+def probe_names():
+    output = {".", "_id", "missing", "build.missing", "result.subtests.missing"}
+    for name in NAMES:
+        for n in (name, untype_path(name)):
+            steps = split_field(n)
+            for i in range(1, len(steps) + 1):
+                prefix = join_field(steps[:i])
+                output.add(prefix)
+                for path in QUERY_PATHS:
+                    output.add(relative_field(prefix, path[0]))
+    return sorted(output)
+
+
+def names(columns):
+    return sorted(c.name for c in columns)
@@ -0,0 +1,99 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from jx_base.expressions import QueryOp
+from jx_python import windows
+from jx_python.containers.list import ListContainer
+from jx_python.lists import aggs
+from mo_dots import to_data
+from mo_json import value2json
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+DATA = [
+    {"a": "x", "b": 1},
+    {"a": "x", "b": 3},
+    {"a": "y", "b": 5},
+    {"a": "y"},
+    {"b": 7},
+]
+
+
+def run(query, columnar):
+    """
+    :return: MAP FROM SELECT NAME TO LIST OF (coord, value), AS list_aggs IS CALLED BY ListContainer.query()
+    """
+    container = ListContainer("testdata", DATA)
+    query_op = QueryOp.wrap(dict(query, **{"from": "testdata"}), container=container, namespace=container)
+    is_columnar = aggs._is_columnar
+    chosen = []
+
+    def check(query, select):
+        chosen.append(columnar and is_columnar(query, select))
+        return chosen[-1]
+
+    aggs._is_columnar = check
+    try:
+        cube = aggs.list_aggs(container.data, query_op)
+    finally:
+        aggs._is_columnar = is_columnar
+    if chosen != [columnar]:
+        raise AssertionError("expecting columnar=" + str(columnar))
+    return {name: sorted(m) for name, m in cube.data.items()}
+
+
+class TestColumnarAggs(FuzzyTestCase):
+    def test_matches_row_path(self):
+        query = {
+            "edges": ["a"],
+            "select": [
+                {"name": "count", "value": "b", "aggregate": "count"},
+                {"name": "sum", "value": "b", "aggregate": "sum"},
+                {"name": "min", "value": "b", "aggregate": "min"},
+                {"name": "max", "value": "b", "aggregate": "max"},
+                {"name": "median", "value": "b", "aggregate": "median"},
+                {"name": "average", "value": "b", "aggregate": "avg"},
+            ],
+        }
+        self.assertEqual(run(query, True), run(query, False))
+
+    def test_expected_values(self):
+        result = run({
+            "edges": ["a"],
+            "select": [
+                {"name": "count", "value": "b", "aggregate": "count"},
+                {"name": "sum", "value": "b", "aggregate": "sum"},
+                {"name": "average", "value": "b", "aggregate": "average"},
+            ],
+        }, True)
+        # PARTITIONS ARE x, y, THEN null
+        self.assertEqual(result["count"], [((0,), 2), ((1,), 1), ((2,), 1)])
+        self.assertEqual(result["sum"], [((0,), 4), ((1,), 5), ((2,), 7)])
+        self.assertEqual(result["average"], [((0,), 2), ((1,), 5), ((2,), 7)])
+
+    def test_average_skips_nulls(self):
+        result = run({
+            "edges": [{"name": "a", "value": "a", "domain": {"type": "set", "partitions": ["x", "y", "z"]}}],
+            "select": [{"name": "average", "value": "b", "aggregate": "average"}],
+        }, True)
+        # y HAS ONE null b, z HAS NO ROWS
+        self.assertEqual(value2json(result["average"]), value2json([((0,), 2), ((1,), 5), ((2,), None), ((3,), 7)]))
+
+    def test_columnar_aggregates_have_accumulators(self):
+        for name in aggs._columnar_aggregates:
+            self.assertIn(name, windows.name2accumulator)
+
+    def test_unsupported_aggregate_not_columnar(self):
+        query = to_data({
+            "edges": [{"name": "a", "value": "a", "domain": {"partitions": ["x", "y"]}}],
+            "select": [{"name": "b", "value": "b", "aggregate": "list"}],
+        })
+        self.assertFalse(aggs._is_columnar(query, query.select))
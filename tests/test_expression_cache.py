@@ -0,0 +1,50 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from jx_python.expressions import _utils
+from jx_python.expressions._utils import cache_stats, jx_expression_to_function
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+
+class TestExpressionCache(FuzzyTestCase):
+    def setUp(self):
+        _utils._cache.clear()
+
+    def test_same_json_reused(self):
+        a = jx_expression_to_function({"add": ["a", 1]})
+        b = jx_expression_to_function({"add": ["a", 1]})
+        self.assertIs(a, b)
+        self.assertEqual(a({"a": 2}), 3)
+        self.assertEqual(cache_stats().size, 1)
+
+    def test_different_json_not_shared(self):
+        a = jx_expression_to_function({"add": ["a", 1]})
+        b = jx_expression_to_function({"add": ["a", 2]})
+        self.assertIsNot(a, b)
+        self.assertEqual(b({"a": 2}), 4)
+
+    def test_hits_counted(self):
+        before = cache_stats()
+        jx_expression_to_function("a")
+        jx_expression_to_function("a")
+        after = cache_stats()
+        self.assertEqual(after.misses - before.misses, 1)
+        self.assertEqual(after.hits - before.hits, 1)
+
+    def test_bounded(self):
+        old_size, _utils.MAX_CACHE_SIZE = _utils.MAX_CACHE_SIZE, 3
+        try:
+            for i in range(10):
+                jx_expression_to_function({"add": ["a", i]})
+            self.assertEqual(cache_stats().size, 3)
+        finally:
+            _utils.MAX_CACHE_SIZE = old_size
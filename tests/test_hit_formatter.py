@@ -0,0 +1,67 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from jx_elasticsearch.es52 import set_format
+from jx_elasticsearch.es52.set_format import compile_hit_formatter, doc_formatter, row_formatter
+from jx_python.expressions import jx_expression_to_function
+from mo_dots import Data, list_to_data
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+HITS = [
+    {"_id": "1", "fields": {"a": [1], "b.c": ["x"]}},
+    {"_id": "2", "fields": {"a": [2, 3]}},
+    {"_id": "3"},
+]
+
+
+def pull_id(row):
+    return row["1"]["_id"]
+
+
+def new_select():
+    return list_to_data([
+        {"name": "a", "put": {"name": "a", "index": 0, "child": "."}, "pull": jx_expression_to_function("1.fields.a")},
+        {"name": "c", "put": {"name": "c", "index": 1, "child": "."}, "pull": jx_expression_to_function("1.fields.b\\.c")},
+        {"name": "id", "put": {"name": "id", "index": 2, "child": "."}, "pull": pull_id},
+    ])
+
+
+class TestHitFormatter(FuzzyTestCase):
+    def test_table(self):
+        select = new_select()
+        formatter = compile_hit_formatter(select, Data(format="table"))
+        expected = row_formatter(select)
+        self.assertEqual(
+            [formatter(h) for h in HITS],
+            [expected({"0": {}, "1": h}) for h in HITS],
+        )
+
+    def test_list(self):
+        select = new_select()
+        query = Data(format="list", select=[{}, {}, {}])
+        formatter = compile_hit_formatter(select, query)
+        expected = doc_formatter(select, query)
+        self.assertEqual(
+            [formatter(h) for h in HITS],
+            [expected({"0": {}, "1": h}) for h in HITS],
+        )
+
+    def test_cached_by_shape(self):
+        set_format._hit_formatters.clear()
+        compile_hit_formatter(new_select(), Data(format="table"))
+        compile_hit_formatter(new_select(), Data(format="table"))
+        self.assertEqual(len(set_format._hit_formatters), 1)
+
+    def test_deep_put_not_compiled(self):
+        select = new_select()
+        select[0].put.child = "b"
+        self.assertIsNone(compile_hit_formatter(select, Data(format="table")))
@@ -0,0 +1,130 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from jx_python import jx
+from jx_python.containers.list import ListContainer
+from jx_python.lists.join import join
+from mo_dots import Data
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+PEOPLE = [
+    {"id": 1, "name": "ann"},
+    {"id": 2, "name": "bob"},
+    {"id": 3, "name": "cat"},
+    {"name": "dan"},
+]
+
+PETS = [
+    {"owner": 1, "pet": "fido"},
+    {"owner": 1, "pet": "rex"},
+    {"owner": 3, "pet": "tom"},
+    {"owner": 4, "pet": "jerry"},
+]
+
+
+def pairs(rows):
+    return sorted(
+        (r.left.name or "", r.right.pet or "") for r in rows
+    )
+
+
+class TestJoin(FuzzyTestCase):
+    def test_inner(self):
+        self.assertEqual(
+            pairs(join(PEOPLE, PETS, {"id": "owner"})),
+            [("ann", "fido"), ("ann", "rex"), ("cat", "tom")],
+        )
+
+    def test_left(self):
+        self.assertEqual(
+            len(list(join(PEOPLE, PETS, {"id": "owner"}, type="left"))),
+            5,  # ann TWICE, bob, cat, dan
+        )
+
+    def test_outer(self):
+        rows = list(join(PEOPLE, PETS, {"id": "owner"}, type="outer"))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual([r.right.pet for r in rows if r.left == None], ["jerry"])
+
+    def test_sort_merge_matches_hash(self):
+        people = [p for p in PEOPLE if "id" in p]
+        for type in ("inner", "left", "outer"):
+            self.assertEqual(
+                pairs(join(people, PETS, {"id": "owner"}, type=type, presorted=True)),
+                pairs(join(people, PETS, {"id": "owner"}, type=type)),
+            )
+
+    def test_build_stats(self):
+        stats = Data()
+        list(join(PEOPLE, PETS, {"id": "owner"}, stats=stats))
+        self.assertEqual(stats.build_rows, 4)
+        self.assertEqual(stats.build_keys, 3)
+        self.assertGreater(stats.build_bytes, 0)
+
+    def test_from_join(self):
+        result = jx.run({
+            "from": {"join": {"left": PEOPLE, "right": PETS, "on": {"id": "owner"}}},
+            "select": ["left.name", "right.pet"],
+            "sort": "right.pet",
+            "format": "list",
+        })
+        self.assertEqual(
+            result.data,
+            [
+                {"left": {"name": "ann"}, "right": {"pet": "fido"}},
+                {"left": {"name": "ann"}, "right": {"pet": "rex"}},
+                {"left": {"name": "cat"}, "right": {"pet": "tom"}},
+            ],
+        )
+
+    def test_sub_query_sides(self):
+        people = ListContainer("people", PEOPLE)
+        result = jx.run(
+            {
+                "from": {"join": {
+                    "left": {"from": "people", "where": {"exists": "id"}},
+                    "right": {"from": PETS, "where": {"ne": {"pet": "rex"}}},
+                    "on": {"id": "owner"},
+                }},
+                "select": ["left.name", "right.pet"],
+                "sort": "right.pet",
+                "format": "list",
+            },
+            container=people,
+        )
+        self.assertEqual(
+            result.data,
+            [
+                {"left": {"name": "ann"}, "right": {"pet": "fido"}},
+                {"left": {"name": "cat"}, "right": {"pet": "tom"}},
+            ],
+        )
+
+    def test_list_sub_query_sides(self):
+        result = jx.run({
+            "from": {"join": {
+                "left": {"from": PEOPLE, "where": {"eq": {"name": "ann"}}},
+                "right": {"from": PETS},
+                "on": {"id": "owner"},
+                "type": "left",
+            }},
+            "select": ["left.name", "right.pet"],
+            "sort": "right.pet",
+            "format": "list",
+        })
+        self.assertEqual(
+            result.data,
+            [
+                {"left": {"name": "ann"}, "right": {"pet": "fido"}},
+                {"left": {"name": "ann"}, "right": {"pet": "rex"}},
+            ],
+        )
@@ -11,7 +11,6 @@ from __future__ import absolute_import, division, unicode_literals
 from unittest import skipIf
 
 from jx_base.expressions.query_op import MAX_LIMIT
-from jx_elasticsearch.es52 import agg_bulk
 from jx_python import jx
 from mo_dots import to_data, list_to_data
 from mo_future import text
@@ -19,6 +18,7 @@ from mo_logs import Log
 from mo_threads import Till
 from mo_times import MINUTE
 from mo_http import http
+from tests import test_jx
 from tests.test_jx import BaseTestCase, TEST_TABLE
 
 
@@ -41,7 +41,7 @@ class TestBulk(BaseTestCase):
 
         return output
 
-    @skipIf(not agg_bulk.S3_CONFIG, "can not test S3")
+    @skipIf(not test_jx.global_settings.bulk, "bulk storage is not configured")
     def test_bulk_aggs_list(self):
         data = list_to_data([{"a": "test" + text(i)} for i in range(10111)])
         expected = jx.sort([{"a": r.a, "count": 1} for r in data], "a")
@@ -76,7 +76,7 @@ class TestBulk(BaseTestCase):
             sorted_expected = jx.sort(expected, "a")
             self.assertEqual(sorted_content, sorted_expected)
 
-    @skipIf(not agg_bulk.S3_CONFIG, "can not test S3")
+    @skipIf(not test_jx.global_settings.bulk, "bulk storage is not configured")
     def test_bulk_aggs_list_no_records(self):
         data = list_to_data([{"a": "test" + text(i)} for i in range(10111)])
         expected = []
@@ -112,7 +112,7 @@ class TestBulk(BaseTestCase):
             sorted_expected = jx.sort(expected, "a")
             self.assertEqual(sorted_content, sorted_expected)
 
-    @skipIf(not agg_bulk.S3_CONFIG, "can not test S3")
+    @skipIf(not test_jx.global_settings.bulk, "bulk storage is not configured")
     def test_scroll_query_list(self):
         data = list_to_data([{"a": "test" + text(i)} for i in range(10111)])
         expected = jx.sort(data, "a")
@@ -145,7 +145,7 @@ class TestBulk(BaseTestCase):
             sorted_content = jx.sort(content.data, "a")
             self.assertEqual(sorted_content, expected)
 
-    @skipIf(not agg_bulk.S3_CONFIG, "can not test S3")
+    @skipIf(not test_jx.global_settings.bulk, "bulk storage is not configured")
     def test_bulk_aggs_table(self):
         data = list_to_data([{"a": "test" + text(i)} for i in range(10111)])
         expected = jx.sort([{"a": r.a, "count": 1} for r in data], "a")
@@ -181,7 +181,7 @@ class TestBulk(BaseTestCase):
             sorted_expected = [(row.a, row.c) for row in expected]
             self.assertEqual(sorted_content, sorted_expected)
 
-    @skipIf(not agg_bulk.S3_CONFIG, "can not test S3")
+    @skipIf(not test_jx.global_settings.bulk, "bulk storage is not configured")
     def test_scroll_query_table(self):
         data = list_to_data([{"a": "test" + text(i)} for i in range(10111)])
         expected = jx.sort(data, "a")
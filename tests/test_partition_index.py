@@ -0,0 +1,60 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from jx_base.domains import Domain, PartitionIndex
+from mo_dots import list_to_data
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times import Date, DAY, HOUR
+
+
+def brute_force(partitions, key):
+    for p in partitions:
+        if p.min <= key < p.max:
+            return p.dataIndex
+    return len(partitions)
+
+
+class TestPartitionIndex(FuzzyTestCase):
+    def test_time_domain(self):
+        domain = Domain(type="time", min=Date("2020-01-01"), max=Date("2020-01-03"), interval=HOUR)
+        keys = [Date("2020-01-01") + HOUR * (i / 2) for i in range(-3, 100)]
+        for k in keys:
+            self.assertEqual(domain.getIndexByKey(k), brute_force(domain.partitions, k))
+        self.assertEqual(domain.getIndexesByKeys(keys), [brute_force(domain.partitions, k) for k in keys])
+
+    def test_range_with_holes(self):
+        domain = Domain(type="range", key="min", partitions=[
+            {"min": 0, "max": 10},
+            {"min": 20, "max": 30},
+            {"min": 10, "max": 15},
+        ])
+        self.assertEqual(domain.getIndexByKey(5), 0)
+        self.assertEqual(domain.getIndexByKey(12), 2)
+        self.assertEqual(domain.getIndexByKey(17), 3)
+        self.assertEqual(domain.getIndexByKey(30), 3)
+        self.assertEqual(domain.getPartByKey(25).min, 20)
+
+    def test_range_overlap(self):
+        self.assertRaises(Exception, lambda: Domain(type="range", key="min", partitions=[
+            {"min": 0, "max": 10},
+            {"min": 5, "max": 15},
+        ]))
+
+    def test_converted_bounds(self):
+        parts = list_to_data([
+            {"min": Date("2020-01-01") + DAY * i, "max": Date("2020-01-01") + DAY * (i + 1), "dataIndex": i}
+            for i in range(10)
+        ])
+        index = PartitionIndex(parts, lambda x: x.unix)
+        self.assertEqual(index.find(Date("2020-01-04").unix + 1).dataIndex, 3)
+        self.assertIsNone(index.find(Date("2019-12-31").unix))
+        self.assertIsNone(index.find(None))
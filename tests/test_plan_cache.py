@@ -0,0 +1,212 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from copy import deepcopy
+
+from jx_base.expressions import QueryOp, jx_expression
+from jx_elasticsearch.es52.agg_format import format_table_from_groupby
+from jx_elasticsearch.es52.agg_op import aggop_rebuild, aggop_to_plan
+from jx_elasticsearch.es52.plan_cache import PlanCache, query_template
+from jx_elasticsearch.es52.set_op import setop_to_plan
+from mo_dots import Data, FlatList
+from mo_json import scrub, value2json
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_threads import Till
+from tests.test_agg_format import GROUPBY_AGGS, FakeContainer
+
+
+class FakeNamespace(object):
+    def __init__(self):
+        self.version = 0
+
+    def schema_version(self, alias):
+        return self.version
+
+
+def fake_query(where):
+    return Data(frum=Data(name="testdata"), select={"value": "a"}, format="list", where=jx_expression(where))
+
+
+class Translator(object):
+    def __init__(self, transform=lambda v: v, reusable=True):
+        self.calls = 0
+        self.transform = transform
+        self.reusable = reusable
+
+    def __call__(self, query):
+        self.calls += 1
+        value = self.transform(query.where.rhs.value)
+        return {"query": {"term": {"a": value}}, "size": 10}, "parts", self.reusable
+
+
+class TestPlanCache(FuzzyTestCase):
+    def test_template_ignores_literals(self):
+        key1, params1 = query_template(fake_query({"eq": {"a": 1}}))
+        key2, params2 = query_template(fake_query({"eq": {"a": 2}}))
+        key3, _ = query_template(fake_query({"eq": {"b": 2}}))
+        self.assertEqual(key1, key2)
+        self.assertEqual(params1, [1])
+        self.assertEqual(params2, [2])
+        self.assertNotEqual(key1, key3)
+
+    def test_substitute_literals(self):
+        plans = PlanCache(FakeNamespace())
+        translate = Translator()
+
+        body, parts, timing = plans.get_plan("testdata", fake_query({"eq": {"a": 1}}), translate)
+        self.assertEqual(timing.cache, "miss")
+        body, parts, timing = plans.get_plan("testdata", fake_query({"eq": {"a": 2}}), translate)
+        self.assertEqual(timing.cache, "miss")  # SUBSTITUTION IS CONFIRMED
+        self.assertEqual(translate.calls, 2)
+
+        body, parts, timing = plans.get_plan("testdata", fake_query({"eq": {"a": 3}}), translate)
+        self.assertEqual(timing.cache, "hit")
+        self.assertEqual(translate.calls, 2)
+        self.assertEqual(body, {"query": {"term": {"a": 3}}, "size": 10})
+        self.assertEqual(parts, "parts")
+
+    def test_transformed_literals_are_not_substituted(self):
+        plans = PlanCache(FakeNamespace())
+        translate = Translator(transform=lambda v: v + 100)
+
+        for v in [1, 2, 3, 1]:
+            body, _, _ = plans.get_plan("testdata", fake_query({"eq": {"a": v}}), translate)
+            self.assertEqual(body, {"query": {"term": {"a": v + 100}}, "size": 10})
+        self.assertEqual(translate.calls, 3)
+
+    def test_column_change_invalidates(self):
+        namespace = FakeNamespace()
+        plans = PlanCache(namespace)
+        translate = Translator()
+        query = fake_query({"eq": {"a": 1}})
+
+        plans.get_plan("testdata", query, translate)
+        _, _, timing = plans.get_plan("testdata", query, translate)
+        self.assertEqual(timing.cache, "hit")
+
+        namespace.version += 1
+        _, _, timing = plans.get_plan("testdata", query, translate)
+        self.assertEqual(timing.cache, "miss")
+        self.assertEqual(plans.stats().invalidations, 1)
+
+    def test_not_reusable(self):
+        plans = PlanCache(FakeNamespace())
+        translate = Translator(reusable=False)
+        query = fake_query({"eq": {"a": 1}})
+
+        plans.get_plan("testdata", query, translate)
+        plans.get_plan("testdata", query, translate)
+        self.assertEqual(translate.calls, 2)
+        self.assertEqual(plans.stats().plans, 0)
+
+    def test_relative_dates_are_parameters(self):
+        key1, params1 = query_template(fake_query({"gte": {"t": {"date": "now"}}}))
+        key2, params2 = query_template(fake_query({"gte": {"t": {"date": "today-week"}}}))
+        self.assertEqual(key1, key2)
+        self.assertEqual(len(params1), 1)
+        self.assertNotEqual(params1, params2)
+
+    def test_now_is_not_frozen(self):
+        plans = PlanCache(FakeNamespace())
+        translate = Translator()
+
+        for _ in range(4):
+            query = fake_query({"gte": {"t": {"date": "now"}}})
+            body, _, _ = plans.get_plan("testdata", query, translate)
+            self.assertEqual(body["query"]["term"]["a"], query.where.rhs.value)
+            Till(seconds=0.01).wait()
+        self.assertEqual(translate.calls, 2)
+
+
+class TestRealPlans(FuzzyTestCase):
+    """
+    THE REAL TRANSLATIONS, THROUGH THE CACHE, MUST MATCH A FRESH TRANSLATION
+    """
+
+    def setUp(self):
+        self.container = FakeContainer()
+
+    def wrap(self, query):
+        return QueryOp.wrap(query, self.container, self.container)
+
+    def test_aggop_body(self):
+        plans = PlanCache(FakeNamespace())
+        cached_decoders = None
+        for name, expected_cache in [("a", "miss"), ("b", "miss"), ("c", "hit"), ("d", "hit")]:
+            query = {
+                "from": "testdata",
+                "groupby": ["build.branch"],
+                "select": {"value": "result.duration", "aggregate": "sum"},
+                "where": {"and": [{"eq": {"run.name": name}}, {"gt": {"build.date": 1234.5}}]},
+                "format": "table",
+            }
+            body, (_, _, acc, decoders), timing = plans.get_plan(
+                "testdata", self.wrap(query), aggop_to_plan, rebuild=aggop_rebuild
+            )
+            self.assertEqual(timing.cache, expected_cache)
+            expected = scrub(aggop_to_plan(self.wrap(query))[0])
+            self.assertEqual(value2json(body), value2json(expected))
+            self.assertIn(name, value2json(body))
+
+            # EVERY REQUEST GETS ITS OWN DECODERS, AND THE Aggs TREE REFERS TO THEM
+            if cached_decoders is not None:
+                self.assertTrue(all(d is not c for d, c in zip(decoders, cached_decoders)))
+            cached_decoders = decoders
+            self.assertTrue(all(any(d is n for d in decoders) for n in all_decoders(acc)))
+        self.assertEqual(plans.stats().plans, 1)
+
+    def test_aggop_hit_formats(self):
+        plans = PlanCache(FakeNamespace())
+        query = {
+            "from": "testdata",
+            "groupby": ["build.branch"],
+            "select": [
+                {"name": "count", "value": "result.duration", "aggregate": "count"},
+                {"value": "result.duration", "aggregate": "sum"},
+            ],
+            "format": "table",
+        }
+        results = []
+        for expected_cache in ["miss", "hit", "hit"]:
+            _, (q, selects, acc, decoders), timing = plans.get_plan(
+                "testdata", self.wrap(query), aggop_to_plan, rebuild=aggop_rebuild
+            )
+            self.assertEqual(timing.cache, expected_cache)
+            result = format_table_from_groupby(deepcopy(GROUPBY_AGGS), acc, q, decoders, FlatList(selects))
+            results.append(value2json(result.data))
+        self.assertEqual(results[0], value2json([["beta", 1, 2.0], ["master", 3, 6.0], [None, 2, 1.0]]))
+        self.assertEqual(results[1], results[0])
+        self.assertEqual(results[2], results[0])
+
+    def test_setop_body(self):
+        plans = PlanCache(FakeNamespace())
+        for name, expected_cache in [("a", "miss"), ("b", "miss"), ("c", "hit")]:
+            query = {
+                "from": "testdata",
+                "select": ["build.branch", "result.duration"],
+                "where": {"and": [{"eq": {"run.name": name}}, {"gt": {"build.date": 1234.5}}]},
+                "limit": 5,
+                "format": "list",
+            }
+            body, _, timing = plans.get_plan("testdata", self.wrap(query), setop_to_plan)
+            self.assertEqual(timing.cache, expected_cache)
+            expected = scrub(setop_to_plan(self.wrap(query))[0])
+            self.assertEqual(value2json(body), value2json(expected))
+            self.assertIn(name, value2json(body))
+
+
+def all_decoders(acc):
+    for d in acc.decoders:
+        yield d
+    for c in acc.children:
+        for d in all_decoders(c):
+            yield d
@@ -0,0 +1,67 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+
+from mo_http import http
+from mo_http.http import PooledSession
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        content = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPooledSession(FuzzyTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(("localhost", 0), Handler)
+        cls.url = "http://localhost:" + str(cls.server.server_port) + "/"
+        cls.thread = Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_connection_reused(self):
+        session = PooledSession()
+        try:
+            for _ in range(5):
+                self.assertEqual(http.get_json(self.url, session=session), {"ok": True})
+            self.assertEqual(session.stats(), {"requests": 5, "connections": 1, "reused": 4})
+        finally:
+            session.close()
+
+    def test_idle_connections_dropped(self):
+        session = PooledSession(keep_alive=0.5)
+        try:
+            http.get_json(self.url, session=session)
+            session.last_used -= 1
+            http.get_json(self.url, session=session)
+            self.assertEqual(session.stats(), {"requests": 2, "connections": 2, "reused": 0})
+        finally:
+            session.close()
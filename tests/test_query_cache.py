@@ -0,0 +1,69 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from active_data.actions.query_cache import QueryCache
+from mo_dots import Data
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+
+class FakeAlias(object):
+    def __init__(self, alias):
+        self.settings = Data(alias=alias)
+        self.generation = 0
+
+    def get_generation(self):
+        return self.generation
+
+
+class TestQueryCache(FuzzyTestCase):
+    def test_hit_and_miss(self):
+        cache = QueryCache(generation_ttl=0)
+        es = FakeAlias("testdata")
+        key = cache.key({"from": "testdata"}, "list", es)
+
+        self.assertEqual(cache.get(key), None)
+        cache.add(key, {"data": [1, 2, 3]})
+        self.assertEqual(cache.get(key), {"data": [1, 2, 3]})
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "entries": 1})
+
+    def test_timing_not_cached(self):
+        cache = QueryCache(generation_ttl=0)
+        key = cache.key({"from": "testdata"}, "list", FakeAlias("testdata"))
+        result = Data(data=[1], meta={"format": "list", "timing": {"es": 2.5}})
+
+        cache.add(key, result)
+        self.assertEqual(result.meta.timing.es, 2.5)  # ORIGINAL IS UNTOUCHED
+        cached = cache.get(key)
+        self.assertEqual(cached, {"data": [1], "meta": {"format": "list"}})
+        self.assertEqual(cached.meta.timing, None)
+
+    def test_new_generation_changes_key(self):
+        cache = QueryCache(generation_ttl=0)
+        es = FakeAlias("testdata")
+        before = cache.key({"from": "testdata"}, "list", es)
+        es.generation += 1
+        after = cache.key({"from": "testdata"}, "list", es)
+        self.assertNotEqual(before, after)
+
+    def test_lru_eviction(self):
+        cache = QueryCache(max_bytes=25, generation_ttl=0)
+        es = FakeAlias("testdata")
+        keys = [cache.key({"from": "testdata", "limit": i}, "list", es) for i in range(3)]
+
+        cache.add(keys[0], {"data": 0})
+        cache.add(keys[1], {"data": 1})
+        cache.get(keys[0])  # keys[1] IS NOW LEAST RECENTLY USED
+        cache.add(keys[2], {"data": 2})
+
+        self.assertEqual(cache.get(keys[1]), None)
+        self.assertEqual(cache.get(keys[0]), {"data": 0})
+        self.assertEqual(cache.stats().evictions, 1)
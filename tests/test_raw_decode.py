@@ -0,0 +1,128 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from jx_elasticsearch.elasticsearch import Alias, Cluster
+from jx_elasticsearch.search_batch import SearchBatch
+from jx_python.expressions import jx_expression_to_function
+from mo_dots import Data, from_data, unwraplist
+from mo_files import URL
+from mo_future import integer_types, text
+from mo_json import value2json
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+SEARCH_RESPONSE = {
+    "took": 3,
+    "_shards": {"total": 2, "successful": 2, "failed": 0},
+    "hits": {"total": 2, "hits": [
+        {"_id": "0", "fields": {"a": [0], "b": ["x0"]}},
+        {"_id": "1", "fields": {"a": [1], "b": ["x1"]}},
+    ]},
+    "aggregations": {"_match": {"buckets": [
+        {"key": "a", "doc_count": 2, "max": {"value": 4}},
+        {"key": "b", "doc_count": 1, "max": {"value": None}},
+    ]}},
+}
+FAILED_RESPONSE = {"_shards": {"total": 2, "successful": 1, "failed": 1, "failures": [{"reason": "bad"}]}}
+ERROR_RESPONSE = {"error": {"type": "search_phase_execution_exception", "reason": "bad"}}
+
+
+class FakeResponse(object):
+    status_code = 200
+    reason = "OK"
+
+    def __init__(self, content):
+        self.content = value2json(content).encode("utf8")
+        self.all_content = self.content
+
+
+def new_alias(content):
+    cluster = object.__new__(Cluster)
+    cluster.url = URL("http://localhost:9200")
+    cluster.debug = False
+    cluster._send = lambda method, url, **kwargs: FakeResponse(content)
+
+    alias = object.__new__(Alias)
+    alias.cluster = cluster
+    alias.path = "/testdata/test_result"
+    alias.settings = Data()
+    alias.debug = False
+    return alias
+
+
+class TestRawDecode(FuzzyTestCase):
+    def test_search(self):
+        alias = new_alias(SEARCH_RESPONSE)
+        raw = alias.search({"size": 2}, raw=True)
+        wrapped = alias.search({"size": 2})
+
+        assert_plain(raw)
+        self.assertIsInstance(wrapped, Data)
+        self.assertEqual(value2json(raw, sort_keys=True), value2json(from_data(wrapped), sort_keys=True))
+        self.assertEqual(raw["aggregations"]["_match"]["buckets"][0]["max"]["value"], 4)
+
+    def test_multisearch(self):
+        alias = new_alias({"responses": [SEARCH_RESPONSE, SEARCH_RESPONSE]})
+        raw = alias.multisearch([{"size": 2}, {"size": 2}], raw=True)
+        wrapped = alias.multisearch([{"size": 2}, {"size": 2}])
+
+        assert_plain(raw)
+        self.assertEqual(len(raw), 2)
+        self.assertEqual(wrapped[1].hits.hits[1]._id, "1")
+        self.assertEqual(value2json(raw, sort_keys=True), value2json(from_data(wrapped), sort_keys=True))
+
+    def test_errors_are_raised(self):
+        alias = new_alias(FAILED_RESPONSE)
+        self.assertRaises(Exception, lambda: alias.search({"size": 2}, raw=True))
+        alias = new_alias({"responses": [SEARCH_RESPONSE, ERROR_RESPONSE]})
+        self.assertRaises(Exception, lambda: alias.multisearch([{"size": 2}, {"size": 2}], raw=True))
+        with SearchBatch(1):
+            self.assertRaises(Exception, lambda: alias.multisearch([{"size": 2}, {"size": 2}], raw=True))
+
+    def test_multisearch_returns_partial_results(self):
+        alias = new_alias({"responses": [SEARCH_RESPONSE, FAILED_RESPONSE]})
+        responses = alias.multisearch([{"size": 2}, {"size": 2}])
+        self.assertEqual(responses[1]._shards.failed, 1)
+        with SearchBatch(1):
+            responses = alias.multisearch([{"size": 2}, {"size": 2}])
+        self.assertEqual(responses[1]._shards.failed, 1)
+
+    def test_batched_search_checks_shards_like_post(self):
+        alias = new_alias(FAILED_RESPONSE)
+        self.assertRaises(Exception, lambda: alias.search({"size": 2}))
+        alias = new_alias({"responses": [FAILED_RESPONSE]})
+        with SearchBatch(1):
+            self.assertRaises(Exception, lambda: alias.search({"size": 2}))
+
+    def test_compiled_pulls_accept_raw_hits(self):
+        raw = new_alias(SEARCH_RESPONSE).search({"size": 2}, raw=True)
+        wrapped = new_alias(SEARCH_RESPONSE).search({"size": 2})
+        pulls = [jx_expression_to_function("1.fields.a"), jx_expression_to_function("1.fields.b")]
+
+        def pull_all(hits):
+            return [[unwraplist(p({"0": None, "1": hit})) for p in pulls] for hit in hits]
+
+        self.assertEqual(pull_all(raw["hits"]["hits"]), [[0, "x0"], [1, "x1"]])
+        self.assertEqual(pull_all(raw["hits"]["hits"]), pull_all(wrapped.hits.hits))
+
+
+def assert_plain(value):
+    """
+    RAISE IF value HAS ANYTHING BUT PLAIN JSON TYPES
+    """
+    if value.__class__ is dict:
+        for v in value.values():
+            assert_plain(v)
+    elif value.__class__ is list:
+        for v in value:
+            assert_plain(v)
+    elif value is not None and value.__class__ not in (text, bool, float) + integer_types:
+        raise AssertionError("not plain: " + value.__class__.__name__)
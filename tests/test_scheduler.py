@@ -0,0 +1,41 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from active_data.actions.scheduler import Scheduler
+from mo_dots import Data
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_threads import Till
+
+
+class TestScheduler(FuzzyTestCase):
+    def test_results_in_order(self):
+        def execute(query, output, is_done, client):
+            Till(seconds=0.01 * (query % 3)).wait()
+            output.append(Data(value=query))
+
+        scheduler = Scheduler("test thread", execute, 4, 2)
+        result = scheduler.run(list(range(10)), client="test")
+        self.assertEqual([r.value for r in result], list(range(10)))
+        self.assertEqual(scheduler.stats(), {"depth": 0, "running": 0, "waits": 10})
+
+    def test_failure_cancels_remaining(self):
+        started = []
+
+        def execute(query, output, is_done, client):
+            started.append(query)
+            if query == 2:
+                raise Exception("expected failure")
+            output.append(Data(value=query))
+
+        scheduler = Scheduler("test thread", execute, 1, 1)
+        self.assertRaises(Exception, scheduler.run, list(range(100)), "test")
+        self.assertLess(len(started), 100)
@@ -0,0 +1,80 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from active_data.actions.scheduler import Scheduler
+from jx_elasticsearch import search_batch
+from jx_elasticsearch.search_batch import SearchBatch
+from mo_dots import Data
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+
+class FakeAlias(object):
+    path = "/testdata/test_result"
+
+    def __init__(self, url="http://localhost:9200", requests=None):
+        self.cluster = Data(url=url)
+        self.requests = [] if requests is None else requests
+
+    def search(self, query):
+        return search_batch.current().search(self, [query])[0]
+
+    def send_multisearch(self, queries):
+        self.requests.append(queries)
+        return [Data(value=q) for q in queries]
+
+
+class TestSearchBatch(FuzzyTestCase):
+    def test_one_request(self):
+        es = FakeAlias()
+
+        def execute(query, output, is_done, client):
+            output.append(es.search(query))
+
+        scheduler = Scheduler("test thread", execute, 4, 4)
+        batch = SearchBatch(4, width=4)
+        result = scheduler.run(list(range(4)), client="test", member=batch)
+
+        self.assertEqual([r.value for r in result], list(range(4)))
+        self.assertEqual(len(es.requests), 1)
+        self.assertEqual(sorted(es.requests[0]), list(range(4)))
+
+    def test_members_without_search(self):
+        es = FakeAlias()
+
+        def execute(query, output, is_done, client):
+            if query % 2:
+                output.append(Data(value=query))
+            else:
+                output.append(es.search(query))
+
+        scheduler = Scheduler("test thread", execute, 2, 2)
+        batch = SearchBatch(6, width=2)
+        result = scheduler.run(list(range(6)), client="test", member=batch)
+
+        self.assertEqual([r.value for r in result], list(range(6)))
+        self.assertEqual(batch.num_searches, 3)
+
+    def test_same_alias_different_objects(self):
+        requests = []
+        aliases = [FakeAlias(requests=requests) for _ in range(4)]
+        other = FakeAlias(url="http://other:9200", requests=requests)
+
+        def execute(query, output, is_done, client):
+            es = other if query == 4 else aliases[query]
+            output.append(es.search(query))
+
+        scheduler = Scheduler("test thread", execute, 5, 5)
+        batch = SearchBatch(5, width=5)
+        result = scheduler.run(list(range(5)), client="test", member=batch)
+
+        self.assertEqual([r.value for r in result], list(range(5)))
+        self.assertEqual(sorted(len(r) for r in requests), [1, 4])
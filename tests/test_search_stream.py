@@ -0,0 +1,81 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from jx_elasticsearch.elasticsearch import SearchStream, _stream_records
+from mo_json import json2value
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+# PROPERTIES IN THE ORDER ELASTICSEARCH SENDS THEM
+RESPONSE = """{
+    "_scroll_id": "abc",
+    "took": 3,
+    "timed_out": false,
+    "_shards": {"total": 2, "successful": 2, "skipped": 0, "failed": 0},
+    "hits": {
+        "total": 3,
+        "max_score": 1.0,
+        "hits": [
+            {"_id": "0", "_source": {"a": 0, "b": [0, "x"]}},
+            {"_id": "1", "_source": {"a": 1, "b": [1, "x"]}},
+            {"_id": "2", "_source": {"a": 2, "b": [2, "x"]}}
+        ]
+    },
+    "aggregations": {"x": {"value": 1}}
+}"""
+
+
+class FakeResponse(object):
+    def __init__(self, content, chunk_size=7):
+        self.content = content.encode("utf8")
+        self.chunk_size = chunk_size
+        self.closed = False
+
+    def iter_content(self, size):
+        for i in range(0, len(self.content), self.chunk_size):
+            yield self.content[i : i + self.chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+def new_stream(response):
+    return SearchStream(_stream_records(response, SearchStream.query_path, SearchStream.expected_vars))
+
+
+class TestSearchStream(FuzzyTestCase):
+    def test_hits_streamed(self):
+        response = FakeResponse(RESPONSE)
+        result = new_stream(response)
+        self.assertEqual(result._scroll_id, "abc")
+        self.assertEqual(result.hits.total, 3)
+        self.assertFalse(response.closed)
+        self.assertEqual(list(result.hits.hits), json2value(RESPONSE).hits.hits)
+        self.assertTrue(response.closed)
+
+    def test_no_hits(self):
+        response = FakeResponse('{"_shards": {"failed": 0}, "hits": {"total": 0, "hits": []}}')
+        result = new_stream(response)
+        self.assertEqual(result.hits.total, 0)
+        self.assertEqual(list(result.hits.hits), [])
+        self.assertTrue(response.closed)
+
+    def test_shard_failure(self):
+        response = FakeResponse('{"_shards": {"total": 2, "failed": 1}, "hits": {"total": 0, "hits": []}}')
+        self.assertRaises(Exception, new_stream, response)
+        self.assertTrue(response.closed)
+
+    def test_close_early(self):
+        response = FakeResponse(RESPONSE)
+        result = new_stream(response)
+        next(result.hits.hits)
+        result.close()
+        self.assertTrue(response.closed)
@@ -0,0 +1,53 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from active_data.actions.query import STREAM_CHUNK_SIZE, stream_result
+from jx_elasticsearch.es52.set_format import format_list
+from mo_dots import Data
+from mo_json import json2value
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_times.timer import Timer
+
+NUM_ROWS = 10000
+
+
+class Counter(object):
+    def __init__(self):
+        self.produced = 0
+
+    def rows(self):
+        for i in range(NUM_ROWS):
+            self.produced += 1
+            yield {"i": i, "text": "x" * 100}
+
+
+class TestStreamResult(FuzzyTestCase):
+    def test_rows_produced_lazily(self):
+        counter = Counter()
+        result = format_list(counter.rows(), [], Data(destination="stream"), formatter=lambda row: row)
+        self.assertEqual(counter.produced, 0)
+
+        with Timer("total", silent=True) as total_timer:
+            pass
+        chunks = stream_result(result, total_timer)
+        head = next(chunks)
+        first = next(chunks)
+        self.assertEqual(head, b'{"data":[')
+        self.assertGreaterEqual(len(first), STREAM_CHUNK_SIZE)
+        self.assertLess(counter.produced, NUM_ROWS)
+
+        response = json2value((head + first + b"".join(chunks)).decode("utf8"))
+        self.assertEqual(counter.produced, NUM_ROWS)
+        self.assertEqual(len(response.data), NUM_ROWS)
+        self.assertEqual(response.data[NUM_ROWS - 1].i, NUM_ROWS - 1)
+        self.assertEqual(response.meta.format, "list")
+        self.assertGreaterEqual(response.meta.timing.total, 0)
@@ -0,0 +1,61 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from jx_base.expressions import jx_expression
+from jx_base.expressions.expression import TermSet, intern_expression, structural_key
+from jx_python.expressions import Python
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+
+class TestTermSet(FuzzyTestCase):
+    def test_equal_expressions_hash_equal(self):
+        a = jx_expression({"eq": {"a": 1}})
+        b = jx_expression({"eq": {"a": 1}})
+        self.assertIsNot(a, b)
+        self.assertEqual(structural_key(a), structural_key(b))
+        self.assertEqual(hash(a), hash(b))
+        self.assertTrue(a == b)
+
+    def test_ops_with_own_eq_are_hashable(self):
+        exprs = [
+            jx_expression({"and": [{"eq": {"a": 1}}, {"eq": {"b": 2}}]}),
+            jx_expression({"or": [{"eq": {"a": 1}}, {"exists": "b"}]}),
+            jx_expression({"not": {"eq": {"a": 1}}}),
+            jx_expression({"in": {"a": [1, 2]}}),
+            jx_expression({"literal": 3}),
+        ]
+        for e in exprs:
+            self.assertEqual(len({e, jx_expression(e.__data__())}), 1)
+
+    def test_intern(self):
+        a = jx_expression({"eq": {"a": 1}})
+        b = jx_expression({"eq": {"a": 1}})
+        self.assertIs(intern_expression(a), intern_expression(b))
+
+    def test_term_set(self):
+        terms = TermSet([jx_expression({"eq": {"a": i % 10}}) for i in range(100)])
+        self.assertEqual(len(terms), 10)
+        self.assertIn(jx_expression({"eq": {"a": 3}}), terms)
+        self.assertNotIn(jx_expression({"eq": {"a": 30}}), terms)
+
+    def test_large_or_deduplicated(self):
+        expr = jx_expression({"or": [{"eq": {"a": i % 500}} for i in range(1000)]})
+        result = expr.partial_eval(Python)
+        self.assertEqual(len(result.terms), 500)
+
+    def test_and_deduplicated(self):
+        expr = jx_expression({"and": [{"eq": {"a": 1}}, {"eq": {"b": 2}}, {"eq": {"a": 1}}]})
+        expected = jx_expression({"and": [{"eq": {"a": 1}}, {"eq": {"b": 2}}]})
+        result = expr.partial_eval(Python)
+        # EACH eq BECOMES (not missing, basic.eq); THE REPEATED eq ADDS NOTHING
+        self.assertEqual(len(result.terms), 4)
+        self.assertEqual(result.__data__(), expected.partial_eval(Python).__data__())
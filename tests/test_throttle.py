@@ -0,0 +1,67 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+from jx_elasticsearch.throttle import BULK, INTERACTIVE, METADATA, Throttle
+from mo_testing.fuzzytestcase import FuzzyTestCase
+from mo_threads import Thread, Till
+
+
+def acquire_later(throttle, priority, acquired):
+    def worker(please_stop):
+        throttle.acquire(priority)
+        acquired.append(priority)
+
+    return Thread.run("acquire " + str(priority), worker)
+
+
+class TestThrottle(FuzzyTestCase):
+    def test_class_cap(self):
+        throttle = Throttle(bulk=1, total=10)
+        acquired = []
+        throttle.acquire(BULK)
+        thread = acquire_later(throttle, BULK, acquired)
+        Till(seconds=0.2).wait()
+        self.assertEqual(acquired, [])
+        self.assertEqual(throttle.stats().waiting.bulk, 1)
+
+        throttle.release(BULK)
+        thread.join()
+        self.assertEqual(acquired, [BULK])
+
+    def test_interactive_first(self):
+        throttle = Throttle(interactive=5, metadata=5, total=1)
+        acquired = []
+        throttle.acquire(METADATA)
+        low = acquire_later(throttle, METADATA, acquired)
+        Till(seconds=0.2).wait()
+        high = acquire_later(throttle, INTERACTIVE, acquired)
+        Till(seconds=0.2).wait()
+
+        throttle.release(METADATA)
+        high.join()
+        self.assertEqual(acquired, [INTERACTIVE])
+
+        throttle.release(INTERACTIVE)
+        low.join()
+        self.assertEqual(acquired, [INTERACTIVE, METADATA])
+
+    def test_rejected_shrinks_budget(self):
+        throttle = Throttle(total=8, min_backoff=1, max_backoff=3)
+        self.assertEqual(throttle.rejected(), 1)
+        self.assertEqual(throttle.rejected(), 2)
+        self.assertEqual(throttle.rejected(), 3)
+        self.assertEqual(throttle.stats().limit, 1)
+        self.assertEqual(throttle.stats().rejected, 3)
+
+        for _ in range(20):
+            throttle.accepted()
+        self.assertGreater(throttle.stats().limit, 1)
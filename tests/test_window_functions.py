@@ -0,0 +1,64 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+
+from __future__ import absolute_import, division, unicode_literals
+
+import random
+
+from jx_python import windows
+from mo_math import stats
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+WIDTH = 7
+
+
+def slide(aggregate, values):
+    """
+    :return: aggregate OF EACH WINDOW OF WIDTH values
+    """
+    output = []
+    for i, v in enumerate(values):
+        aggregate.add(v)
+        if i >= WIDTH:
+            aggregate.sub(values[i - WIDTH])
+        output.append(aggregate.end())
+    return output
+
+
+def expected(func, values):
+    output = []
+    for i in range(len(values)):
+        window = [v for v in values[max(0, i - WIDTH + 1):i + 1] if v is not None]
+        output.append(func(window) if window else None)
+    return output
+
+
+class TestWindowFunctions(FuzzyTestCase):
+    def setUp(self):
+        random.seed(42)
+        self.values = [random.choice([None, random.randint(0, 20)]) for _ in range(500)]
+
+    def test_min(self):
+        self.assertEqual(slide(windows.Min(), self.values), expected(min, self.values))
+
+    def test_max(self):
+        self.assertEqual(slide(windows.Max(), self.values), expected(max, self.values))
+
+    def test_median(self):
+        self.assertEqual(
+            slide(windows.median(), self.values),
+            expected(lambda w: stats.percentile(w, 0.5), self.values),
+        )
+
+    def test_percentile(self):
+        self.assertEqual(
+            slide(windows.Percentile(0.9), self.values),
+            expected(lambda w: stats.percentile(w, 0.9), self.values),
+        )